@@ -5,9 +5,91 @@
 """
 
 import requests
-import json
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from claude_mem_db_tool import segment_text
+
+try:
+    from claude_mem_semantic import SemanticIndex
+except ImportError:  # 语义索引为可选功能（需要 numpy）
+    SemanticIndex = None
+
+
+class SearchResultCache:
+    """
+    线程安全的搜索结果缓存，按TTL过期、按LRU淘汰
+    
+    缓存的结果在多个调用方之间共享，应视为只读。
+    """
+    
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(
+        keywords: List[str],
+        logic: str,
+        project: Optional[str],
+        conversation_type: str,
+        limit: int
+    ) -> Tuple:
+        """规范化查询参数：关键字去重、小写并排序，顺序不同的同一查询命中同一条缓存"""
+        normalized = tuple(sorted({k.strip().lower() for k in keywords if k.strip()}))
+        return (normalized, logic.upper(), project or None, conversation_type, int(limit))
+    
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key: Tuple, value: Dict[str, Any]):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, project: str = None) -> int:
+        """清除缓存；指定 project 时只清除该项目的条目（以及不限项目的条目）。返回清除数量"""
+        with self._lock:
+            if project is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [key for key in self._entries if key[2] in (project, None)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
 
 
 class ClaudeMemAIIntegration:
@@ -16,35 +98,139 @@ class ClaudeMemAIIntegration:
     提供多种搜索和分析功能
     """
     
-    def __init__(self, base_url: str = "http://localhost:37777"):
+    # 可能包含解决方案的回复所含的词
+    SOLUTION_KEYWORDS = ['解决', '方案', '修复', '建议', 'solution', 'fix', 'recommend']
+    # 有效的 /api/search-conversations 响应至少包含其中一个键，其他响应不缓存
+    SEARCH_RESULT_KEYS = ('user_prompts', 'ai_responses', 'items')
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:37777",
+        max_workers: int = 8,
+        cache_size: int = 256,
+        cache_ttl: float = 300.0,
+        semantic_index: 'SemanticIndex' = None,
+        timeout: float = 10.0
+    ):
+        """
+        Args:
+            timeout: 单个HTTP请求的超时（秒）；worker 无响应时请求失败而不是一直占用线程池
+            semantic_index: 可选的本地语义索引（claude_mem_semantic.SemanticIndex），
+                提供时 get_relevant_context 和 get_solution_history 同时按语义召回，
+                改写过的问题也能找到相关历史
+        """
         self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
+        # 连续多轮对话的关键字高度重叠，缓存搜索结果避免重复请求；cache_size=0 关闭缓存
+        self.cache = SearchResultCache(maxsize=cache_size, ttl=cache_ttl)
+        # 所有搜索请求共用一个线程池并发执行
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='claude-mem-search')
+        # 正在进行中的请求：相同参数的请求共用同一个 Future
+        self._inflight: Dict[Tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.semantic_index = semantic_index
+        self.timeout = timeout
     
-    def get_relevant_context(self, query: str, project: str = None, conversation_types: List[str] = ['both']) -> Dict[str, Any]:
-        """为AI助手获取相关上下文"""
-        keywords = query.lower().split()
+    def close(self):
+        """关闭线程池和HTTP会话"""
+        self._executor.shutdown(wait=False)
+        self.session.close()
+    
+    def _submit_semantic_search(
+        self,
+        query: str,
+        project: str = None,
+        conversation_type: str = 'both',
+        limit: int = 10
+    ) -> Optional[Future]:
+        """在线程池中执行本地语义搜索，结果结构与 /api/search-conversations 相同；未配置语义索引时返回None"""
+        if self.semantic_index is None:
+            return None
+        return self._executor.submit(self.semantic_index.search_records, query, limit, project, conversation_type)
+    
+    def _fetch(self, params: Dict[str, Any], cache_key: Tuple) -> Dict[str, Any]:
+        # 超时异常直接抛出，由 Future 传给所有等待同一请求的调用方
+        response = self.session.get(f"{self.base_url}/api/search-conversations", params=params, timeout=self.timeout)
+        # 错误响应直接抛出，不能缓存，否则一次瞬时故障会在 cache_ttl 内返回给所有调用方
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, dict) and any(key in data for key in self.SEARCH_RESULT_KEYS):
+            self.cache.put(cache_key, data)
+        return data
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """返回缓存命中/未命中统计"""
+        return self.cache.stats()
+    
+    def invalidate_cache(self, project: str = None) -> int:
+        """清除缓存的搜索结果，例如在写入新对话之后"""
+        return self.cache.invalidate(project)
+    
+    def _submit_search(
+        self,
+        keywords: List[str],
+        project: str = None,
+        conversation_type: str = 'both',
+        limit: int = 10
+    ) -> Future:
+        """提交一次搜索请求
+        
+        命中缓存时直接返回已完成的 Future；相同参数的请求在完成前只发送一次。
+        """
+        key = self.cache.make_key(keywords, 'OR', project, conversation_type, limit)
+        cached = self.cache.get(key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
         
+        params = {
+            'keywords': ','.join(keywords),
+            'logic': 'OR',
+            'limit': limit,
+            'conversation_type': conversation_type
+        }
+        
+        if project:
+            params['project'] = project
+        
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            submitted = future is None
+            if submitted:
+                future = self._executor.submit(self._fetch, params, key)
+                self._inflight[key] = future
+        # 请求可能已经完成，回调会在当前线程立即执行，必须在释放锁之后注册
+        if submitted:
+            future.add_done_callback(lambda _: self._forget_inflight(key))
+        return future
+    
+    def _forget_inflight(self, key: Tuple):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+    
+    def _start_relevant_context(self, query: str, project: str, conversation_types: List[str]) -> List[Tuple[str, Future]]:
+        keywords = self._extract_keywords(query)
+        pending = [
+            (conv_type, self._submit_search(keywords, project, conv_type, limit=10))
+            for conv_type in conversation_types
+        ]
+        for conv_type in conversation_types:
+            semantic = self._submit_semantic_search(query, project, conv_type, limit=10)
+            if semantic is not None:
+                pending.append((conv_type, semantic))
+        return pending
+    
+    def _collect_relevant_context(self, pending: List[Tuple[str, Future]]) -> Dict[str, Any]:
         results = {
             'user_questions': [],
             'ai_solutions': [],
             'related_discussions': []
         }
         
-        # 搜索用户问题和AI解决方案
-        for conv_type in conversation_types:
-            params = {
-                'keywords': ','.join(keywords),
-                'logic': 'OR',
-                'limit': 10,
-                'conversation_type': conv_type
-            }
-            
-            if project:
-                params['project'] = project
-            
+        for conv_type, future in pending:
             try:
-                response = self.session.get(f"{self.base_url}/api/search-conversations", params=params)
-                data = response.json()
+                data = future.result()
                 
                 if conv_type in ['user', 'both']:
                     results['user_questions'].extend(data.get('user_prompts', []))
@@ -55,43 +241,106 @@ class ClaudeMemAIIntegration:
             except Exception as e:
                 print(f"搜索失败: {e}")
         
+        # 关键字搜索和语义搜索可能返回同一条记录
+        results['user_questions'] = self._dedupe(results['user_questions'])
+        results['ai_solutions'] = self._dedupe(results['ai_solutions'])
         return results
     
-    def analyze_user_intent(self, user_message: str, project: str = None) -> Dict[str, Any]:
-        """分析用户意图，查找相关的历史对话"""
-        # 提取关键字
+    @staticmethod
+    def _dedupe(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按id去重，保留第一次出现的记录"""
+        seen = set()
+        unique = []
+        for record in records:
+            if record.get('id') not in seen:
+                seen.add(record.get('id'))
+                unique.append(record)
+        return unique
+    
+    def _start_user_intent(
+        self,
+        user_message: str,
+        project: str,
+        shared: Dict[str, Future] = None
+    ) -> Tuple[List[str], Future, Future]:
+        """shared: 已发出的相同关键字搜索 {对话类型: Future}（limit=10），其结果包含所需的前5条，直接复用"""
         keywords = self._extract_keywords(user_message)
+        shared = shared or {}
+        user_future = shared.get('user') or shared.get('both') or self._submit_search(keywords, project, 'user', limit=5)
+        ai_future = shared.get('ai') or shared.get('both') or self._submit_search(keywords, project, 'ai', limit=5)
+        return keywords, user_future, ai_future
+    
+    def _collect_user_intent(self, pending: Tuple[List[str], Future, Future]) -> Dict[str, Any]:
+        keywords, user_future, ai_future = pending
+        user_results = self._result_list(user_future, 'user_prompts')[:5]
+        ai_results = self._result_list(ai_future, 'ai_responses')[:5]
         
-        # 搜索相关的用户对话
-        user_results = self._search_user_prompts(keywords, project, limit=5)
-        
-        # 搜索相关的AI回复
-        ai_results = self._search_ai_responses(keywords, project, limit=5)
-        
-        analysis = {
+        return {
             'extracted_keywords': keywords,
             'similar_user_questions': user_results,
             'relevant_ai_responses': ai_results,
             'context_recommendations': self._generate_recommendations(user_results, ai_results)
         }
-        
-        return analysis
     
-    def get_solution_history(self, problem_description: str, project: str = None) -> Dict[str, Any]:
-        """获取类似问题的解决历史"""
-        keywords = self._extract_keywords(problem_description)
+    @staticmethod
+    def _result_list(future: Future, key: str) -> List[Dict[str, Any]]:
+        try:
+            return future.result().get(key, [])
+        except Exception:
+            return []
+    
+    def get_relevant_context(self, query: str, project: str = None, conversation_types: List[str] = ['both']) -> Dict[str, Any]:
+        """为AI助手获取相关上下文（各对话类型的搜索并发执行）"""
+        return self._collect_relevant_context(
+            self._start_relevant_context(query, project, conversation_types)
+        )
+    
+    def analyze_user_intent(self, user_message: str, project: str = None) -> Dict[str, Any]:
+        """分析用户意图，查找相关的历史对话（用户对话和AI回复并发搜索）"""
+        return self._collect_user_intent(self._start_user_intent(user_message, project))
+    
+    def get_context_and_intent(
+        self,
+        user_message: str,
+        project: str = None,
+        conversation_types: List[str] = ['both']
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """同时获取相关上下文和用户意图分析
         
-        # 搜索相关的AI回复（可能包含解决方案）
-        ai_responses = self._search_ai_responses(keywords, project, limit=10)
+        两者需要的所有请求一次性并发发出，总延迟约等于一次往返，
+        结果分别与 get_relevant_context 和 analyze_user_intent 相同。
+        意图分析需要的用户对话/AI回复前5条直接取自上下文中相同关键字的搜索
+        （'both' 或对应类型，limit=10），不再单独请求。
+        """
+        context_pending = self._start_relevant_context(user_message, project, conversation_types)
+        # 前 len(conversation_types) 项是关键字搜索，之后是语义搜索
+        shared = {}
+        for conv_type, future in context_pending[:len(conversation_types)]:
+            shared.setdefault(conv_type, future)
+        intent_pending = self._start_user_intent(user_message, project, shared)
+        return (
+            self._collect_relevant_context(context_pending),
+            self._collect_user_intent(intent_pending)
+        )
+    
+    def get_solution_history(self, problem_description: str, project: str = None, limit: int = 10) -> Dict[str, Any]:
+        """获取类似问题的解决历史
         
-        # 筛选可能包含解决方案的回复
-        solution_keywords = ['解决', '方案', '修复', '建议', 'solution', 'fix', 'recommend']
-        solutions = []
+        配置了语义索引时，在本地数据库中一次查询完成：FTS5 bm25 关键字候选和
+        向量相似度候选按倒数排名融合 (RRF)，解决方案词过滤下推到查询中，
+        只读出最终返回的记录。否则通过HTTP关键字搜索后在本地筛选。
+        """
+        keywords = self._extract_keywords(problem_description)
         
-        for response in ai_responses:
-            text = response.get('response_text', '').lower()
-            if any(keyword in text for keyword in solution_keywords):
-                solutions.append(response)
+        if self.semantic_index is not None:
+            solutions = self._search_solutions_hybrid(problem_description, keywords, project, limit)
+        else:
+            # 搜索相关的AI回复（可能包含解决方案），再筛选包含解决方案词的回复
+            ai_responses = self._search_ai_responses(keywords, project, limit=limit)
+            solutions = [
+                response for response in ai_responses
+                if any(word in response.get('response_text', '').lower() for word in self.SOLUTION_KEYWORDS)
+            ]
         
         return {
             'problem_keywords': keywords,
@@ -99,6 +348,30 @@ class ClaudeMemAIIntegration:
             'total_found': len(solutions)
         }
     
+    def _search_solutions_hybrid(
+        self,
+        problem_description: str,
+        keywords: List[str],
+        project: str,
+        limit: int,
+        candidates: int = 50
+    ) -> List[Dict[str, Any]]:
+        """关键字 + 语义混合检索解决方案（见 ClaudeMemDB.search_ai_responses_hybrid）"""
+        try:
+            hits = self.semantic_index.search(problem_description, candidates, project, tables=['ai_responses'])
+            with self.semantic_index.db.reader() as r:
+                return r.search_ai_responses_hybrid(
+                    keywords,
+                    semantic_ids=[row_id for _, row_id, _ in hits],
+                    project=project,
+                    required_terms=self.SOLUTION_KEYWORDS,
+                    limit=limit,
+                    candidates=candidates
+                )
+        except Exception as e:
+            print(f"搜索失败: {e}")
+            return []
+    
     def get_conversation_flow(self, session_id: str) -> Dict[str, Any]:
         """获取特定会话的完整对话流程"""
         # 这里需要实现获取特定会话的完整对话流程
@@ -111,54 +384,20 @@ class ClaudeMemAIIntegration:
         }
     
     def _extract_keywords(self, text: str) -> List[str]:
-        """从文本中提取关键字"""
-        # 简单的关键字提取（实际应用中可以使用更复杂的NLP）
-        import re
-        
-        # 移除标点符号并分词
-        words = re.findall(r'\b\w+\b', text.lower())
+        """从文本中提取关键字
         
-        # 过滤常见停用词
-        stop_words = {'的', '了', '在', '是', '我', '你', '他', '她', '它', '这', '那', '一个', '什么', '怎么', '为什么', '如何'}
-        keywords = [word for word in words if word not in stop_words and len(word) > 1]
-        
-        return keywords[:10]  # 最多返回10个关键字
+        与 ClaudeMemDB 的中文索引共用 segment_text()：英文按词切分，连续汉字在
+        停用词处切分为短语，例如 "数据库连接问题" -> ['数据库连接']
+        """
+        return segment_text(text)[:10]  # 最多返回10个关键字
     
     def _search_user_prompts(self, keywords: List[str], project: str = None, limit: int = 10) -> List[Dict[str, Any]]:
         """搜索用户提示"""
-        params = {
-            'keywords': ','.join(keywords),
-            'logic': 'OR',
-            'limit': limit,
-            'conversation_type': 'user'
-        }
-        
-        if project:
-            params['project'] = project
-        
-        try:
-            response = self.session.get(f"{self.base_url}/api/search-conversations", params=params)
-            return response.json().get('user_prompts', [])
-        except:
-            return []
+        return self._result_list(self._submit_search(keywords, project, 'user', limit), 'user_prompts')
     
     def _search_ai_responses(self, keywords: List[str], project: str = None, limit: int = 10) -> List[Dict[str, Any]]:
         """搜索AI回复"""
-        params = {
-            'keywords': ','.join(keywords),
-            'logic': 'OR',
-            'limit': limit,
-            'conversation_type': 'ai'
-        }
-        
-        if project:
-            params['project'] = project
-        
-        try:
-            response = self.session.get(f"{self.base_url}/api/search-conversations", params=params)
-            return response.json().get('ai_responses', [])
-        except:
-            return []
+        return self._result_list(self._submit_search(keywords, project, 'ai', limit), 'ai_responses')
     
     def _generate_recommendations(self, user_questions: List[Dict], ai_responses: List[Dict]) -> List[str]:
         """生成推荐建议"""
@@ -184,14 +423,8 @@ class ExampleAIAssistant:
     def respond_to_user(self, user_message: str, project: str = None) -> str:
         """AI助手响应用户，集成记忆搜索"""
         
-        # 1. 获取相关上下文
-        context = self.mem_integration.get_relevant_context(
-            query=user_message,
-            project=project
-        )
-        
-        # 2. 分析用户意图
-        intent_analysis = self.mem_integration.analyze_user_intent(
+        # 1. 获取相关上下文 2. 分析用户意图（两者的搜索请求并发执行）
+        context, intent_analysis = self.mem_integration.get_context_and_intent(
             user_message=user_message,
             project=project
         )
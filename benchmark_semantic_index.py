@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+对比语义索引的近似最近邻搜索（IVF-flat）与精确全量扫描的召回率和延迟
+
+默认生成与特征哈希向量形状相近的合成语料（按主题抽取特征、哈希到 dim 维、
+带符号、L2归一化）；--index-dir 可以改用已有的语义索引，查询取自索引中
+随机记录的部分特征。
+
+用法:
+    python3 benchmark_semantic_index.py [--rows N] [--dim D] [--nlist L] [--nprobe 8,16,32] [--queries Q]
+    python3 benchmark_semantic_index.py --index-dir ~/.claude-mem/claude-mem.semantic
+"""
+
+import argparse
+import json
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+
+from claude_mem_semantic import IVFLists, assign_clusters, train_centroids
+
+
+def hashed_vectors(rng, topics, features_per_doc, vocab, dim, bucket_of, sign_of):
+    """按主题抽取特征并哈希为归一化向量，模拟 SemanticIndex 的文档向量"""
+    rows = len(topics)
+    topic_vocab = 2_000
+    # 每个主题有自己的一段词表，主题内按 Zipf 分布取词，另混入少量全局高频词
+    local = np.minimum(rng.zipf(1.3, size=(rows, features_per_doc)) - 1, topic_vocab - 1)
+    features = (topics[:, None] * topic_vocab + local) % vocab
+    common = rng.random((rows, features_per_doc)) < 0.2
+    features[common] = np.minimum(rng.zipf(1.5, size=common.sum()) - 1, 999)
+
+    vectors = np.zeros((rows, dim), dtype=np.float32)
+    np.add.at(vectors, (np.repeat(np.arange(rows), features_per_doc), bucket_of[features].ravel()),
+              sign_of[features].ravel())
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors
+
+
+def synthetic_corpus(rows, queries, dim, seed):
+    rng = np.random.default_rng(seed)
+    vocab = 200_000
+    bucket_of = rng.integers(0, dim, size=vocab)
+    sign_of = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=vocab)
+    n_topics = 1_000
+    topic_weights = 1.0 / np.arange(1, n_topics + 1)
+    topic_weights /= topic_weights.sum()
+
+    vectors = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, 50_000):
+        size = min(50_000, rows - start)
+        topics = rng.choice(n_topics, size=size, p=topic_weights)
+        vectors[start:start + size] = hashed_vectors(rng, topics, 40, vocab, dim, bucket_of, sign_of)
+    # 查询比文档短得多
+    query_topics = rng.choice(n_topics, size=queries, p=topic_weights)
+    query_vectors = hashed_vectors(rng, query_topics, 6, vocab, dim, bucket_of, sign_of)
+    return vectors, query_vectors
+
+
+def index_corpus(index_dir, queries, seed):
+    index_dir = Path(index_dir).expanduser()
+    meta = json.loads((index_dir / 'meta.json').read_text(encoding='utf-8'))
+    vectors = np.memmap(index_dir / 'vectors.f32', dtype=np.float32, mode='r', shape=(meta['count'], meta['dim']))
+    rng = np.random.default_rng(seed)
+    # 保留随机记录中最大的几个分量作为查询，模拟只说出部分关键词的问题
+    query_vectors = np.array(vectors[np.sort(rng.choice(len(vectors), queries, replace=False))])
+    cutoff = -np.sort(-np.abs(query_vectors), axis=1)[:, 7:8]
+    query_vectors[np.abs(query_vectors) < cutoff] = 0
+    query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+    return vectors, query_vectors
+
+
+def top_k(scores, k):
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='语义索引近似搜索 vs 精确搜索基准')
+    parser.add_argument('--rows', type=int, default=300_000, help='合成语料记录数 (默认: 300000)')
+    parser.add_argument('--dim', type=int, default=256, help='向量维度 (默认: 256)')
+    parser.add_argument('--index-dir', help='使用已有语义索引的向量代替合成语料')
+    parser.add_argument('--nlist', type=int, help='簇数 (默认: sqrt(记录数))')
+    parser.add_argument('--nprobe', default='4,8,16,32,64,128', help='逗号分隔的 nprobe 取值')
+    parser.add_argument('--queries', type=int, default=200, help='查询数 (默认: 200)')
+    parser.add_argument('-k', type=int, default=10, help='top-k (默认: 10)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.index_dir:
+        vectors, queries = index_corpus(args.index_dir, args.queries, args.seed)
+    else:
+        vectors, queries = synthetic_corpus(args.rows, args.queries, args.dim, args.seed)
+    print(f"📦 {len(vectors)} 条 x {vectors.shape[1]} 维, {len(queries)} 个查询 ({time.perf_counter() - start:.1f}s)")
+
+    nlist = args.nlist or max(16, int(math.sqrt(len(vectors))))
+    start = time.perf_counter()
+    centroids = train_centroids(vectors, nlist, seed=args.seed)
+    ivf = IVFLists(centroids, assign_clusters(centroids, vectors))
+    print(f"🔧 训练并分配 {nlist} 个簇: {time.perf_counter() - start:.1f}s\n")
+
+    start = time.perf_counter()
+    truth = [set(top_k(vectors @ q, args.k)) for q in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"{'search':<14} {'recall@' + str(args.k):>10} {'ms/query':>9} {'scanned':>8} {'speedup':>8}")
+    print(f"{'exact':<14} {1.0:>10.3f} {exact_ms:>9.2f} {1.0:>8.1%} {1.0:>7.1f}x")
+    for nprobe in (int(value) for value in args.nprobe.split(',')):
+        if nprobe > nlist:
+            continue
+        hits = 0
+        scanned = 0
+        start = time.perf_counter()
+        for q, expected in zip(queries, truth):
+            rows = ivf.probe(q, nprobe)
+            found = rows[top_k(vectors[rows] @ q, min(args.k, len(rows)))]
+            hits += len(expected.intersection(found))
+            scanned += len(rows)
+        ann_ms = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"{'nprobe=' + str(nprobe):<14} {hits / (args.k * len(queries)):>10.3f} {ann_ms:>9.2f} "
+              f"{scanned / len(queries) / len(vectors):>8.1%} {exact_ms / ann_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
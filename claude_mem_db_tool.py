@@ -6,19 +6,350 @@ Claude-Mem数据库访问工具
 
 import sqlite3
 import json
-from datetime import datetime
-from typing import List, Dict, Optional, Any
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Any, Iterator, Tuple
 import re
+import base64
+import copy
+import gzip
+import io
+import queue
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 列式导出为可选功能
+    pa = None
+    pq = None
+
+
+# 与 worker 的 Database.ts 保持一致的连接调优参数
+SQLITE_MMAP_SIZE_BYTES = 256 * 1024 * 1024  # 256MB
+SQLITE_CACHE_SIZE_PAGES = 10_000
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+
+def encode_cursor(created_at_epoch: int, row_id: int) -> str:
+    """将 (created_at_epoch, id) 编码为不透明的分页游标"""
+    raw = f"{int(created_at_epoch)}:{int(row_id)}".encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """解码分页游标，返回 (created_at_epoch, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        epoch, row_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii').split(':')
+        return int(epoch), int(row_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+# 中日韩字符：这些文字不用空格分词，FTS5默认分词器会把整段连续字符当作一个词
+CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af'
+_CJK_PATTERN = re.compile(f'[{CJK_CHARS}]')
+# 连续的中日韩字符，或连续的其他文字/数字
+_TOKEN_PATTERN = re.compile(f'[{CJK_CHARS}]+|[^\\W{CJK_CHARS}]+')
+
+# 查询分词时去掉的停用词；中文停用词同时作为切分连续汉字的边界
+CJK_STOP_WORDS = {
+    '的', '了', '吗', '呢', '吧', '啊', '很', '和', '与', '或', '是', '我', '你', '他', '她', '它', '这', '那', '请',
+    '我们', '你们', '他们', '什么', '怎么', '怎样', '如何', '为什么', '为何', '一个', '这个', '那个', '这些', '那些',
+    '问题', '可以', '能否', '是否', '有没有', '没有', '有什么', '需要', '应该', '还是', '但是', '因为', '所以',
+    '如果', '然后', '现在', '已经', '一下', '时候', '一些', '帮我', '请问',
+}
+LATIN_STOP_WORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'be', 'to', 'of', 'in', 'on', 'at', 'for', 'with', 'and', 'or',
+    'it', 'this', 'that', 'i', 'my', 'me', 'we', 'you', 'do', 'does', 'how', 'what', 'why', 'can', 'should',
+}
+_MAX_STOP_WORD_LEN = max(len(word) for word in CJK_STOP_WORDS)
+
+
+def _split_cjk_run(run: str) -> List[str]:
+    """在停用词处切分一段连续汉字，停用词本身被丢弃（最长匹配优先）"""
+    segments = []
+    current = ''
+    i = 0
+    while i < len(run):
+        for length in range(_MAX_STOP_WORD_LEN, 0, -1):
+            if run[i:i + length] in CJK_STOP_WORDS:
+                if current:
+                    segments.append(current)
+                    current = ''
+                i += length
+                break
+        else:
+            current += run[i]
+            i += 1
+    if current:
+        segments.append(current)
+    return segments
+
+
+def segment_text(text: str) -> List[str]:
+    """
+    查询分词：英文/数字按词切分，连续汉字在停用词处切分为短语
+
+    去掉停用词、单个字符和重复项，保留出现顺序。例如
+    "数据库连接问题" -> ['数据库连接']，"React组件渲染很慢" -> ['react', '组件渲染']
+    """
+    keywords = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(token):
+            parts = _split_cjk_run(token)
+        else:
+            parts = [] if token in LATIN_STOP_WORDS else [token]
+        for part in parts:
+            if len(part) > 1 and part not in keywords:
+                keywords.append(part)
+    return keywords
+
+
+def cjk_bigram_text(text: str) -> str:
+    """
+    把连续汉字展开为重叠的二字组，其他词保持不变，以空格分隔
+
+    二元组FTS索引对正文和查询做同样的转换："数据库" -> "数据 据库"，
+    查询短语要求二字组相邻出现，等价于按子串匹配整段汉字。
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text or ''):
+        if len(token) > 1 and _CJK_PATTERN.match(token):
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return ' '.join(tokens)
+
+
+def load_checkpoint(path: str) -> Dict[str, int]:
+    """读取 changes_since() 的检查点文件，文件不存在时返回空检查点（从头同步）"""
+    path = Path(path).expanduser()
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return {table: int(row_id) for table, row_id in json.load(f).items()}
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, int]):
+    """原子地保存检查点：先写临时文件再替换，中途崩溃不会留下半个文件"""
+    path = Path(path).expanduser()
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def open_connection(
+    db_path: str,
+    read_only: bool = False,
+    busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS,
+    check_same_thread: bool = True
+) -> sqlite3.Connection:
+    """
+    打开并调优SQLite连接
+    
+    只读模式使用 mode=ro URI 并开启 query_only，不会获取写锁；
+    worker 已将数据库设为 WAL 模式，只读连接可以与其写入并发执行。
+    """
+    if read_only:
+        uri = Path(db_path).expanduser().resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread)
+    else:
+        conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row  # 允许按列名访问
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE_BYTES}")
+    conn.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE_PAGES}")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+class ConnectionPool:
+    """
+    线程安全的只读连接池
+    
+    连接按需创建，最多 size 个；池满时借用方阻塞等待归还。
+    每个连接同一时刻只被一个线程使用。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 4,
+        busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS
+    ):
+        self.db_path = db_path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self, timeout: float = None) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("连接池已关闭")
+            if len(self._all) < self.size:
+                conn = open_connection(
+                    self.db_path,
+                    read_only=True,
+                    busy_timeout_ms=self.busy_timeout_ms,
+                    check_same_thread=False
+                )
+                self._all.append(conn)
+                return conn
+        
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"等待数据库连接超时 ({timeout}s)") from None
+
+    @contextmanager
+    def connection(self, timeout: float = None) -> Iterator[sqlite3.Connection]:
+        """借用一个连接，退出上下文时归还"""
+        conn = self._acquire(timeout)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        """关闭池中所有连接"""
+        with self._lock:
+            self._closed = True
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
 
 
 class ClaudeMemDB:
-    def __init__(self, db_path: str = None):
-        """初始化数据库连接"""
+    # iter_* 方法每次从游标批量读取的行数
+    DEFAULT_BATCH_SIZE = 500
+
+    # 排序搜索摘要中命中词的标记和省略符
+    SNIPPET_MARKERS = ('[', ']', '…')
+
+    # 按需创建的FTS5索引：源表 -> (FTS表名, 索引列)
+    FTS_INDEXES = {
+        'ai_responses': ('ai_responses_fts', ['response_text']),
+        'user_prompts': ('user_prompts_fts', ['prompt_text']),
+        'tool_executions': ('tool_executions_fts', ['tool_input', 'tool_output', 'error_message']),
+    }
+
+    # LIKE子串搜索使用的 trigram FTS5 索引：源表 -> (FTS表名, 索引列)
+    TRIGRAM_INDEXES = {
+        'ai_responses': ('ai_responses_trigram', ['response_text']),
+        'user_prompts': ('user_prompts_trigram', ['prompt_text']),
+        'tool_executions': ('tool_executions_trigram', ['tool_input', 'tool_output', 'error_message']),
+    }
+    # trigram 索引只能匹配至少3个字符的关键字
+    TRIGRAM_MIN_CHARS = 3
+    # 候选行超过表行数的这个比例时，按时间索引顺序扫描 + LIKE 更快
+    TRIGRAM_MAX_CANDIDATE_RATIO = 0.05
+
+    # 中文二元组FTS索引：源表 -> (FTS表名, 索引列)
+    # 无内容 (content='') 表只存倒排索引，由 refresh_cjk_index() 按id增量维护
+    CJK_FTS_INDEXES = {
+        'ai_responses': ('ai_responses_cjk', 'response_text'),
+        'user_prompts': ('user_prompts_cjk', 'prompt_text'),
+    }
+
+    # project_stats 中代表 project 为NULL的记录的键，只计入总体统计
+    UNASSIGNED_PROJECT = '\x00'
+    # 已汇总记录被删除或修改时标记 project_stats 需要重建的触发器：触发器名 -> 事件
+    PROJECT_STATS_TRIGGERS = {
+        'project_stats_ai_responses_ad': 'DELETE',
+        'project_stats_ai_responses_au': 'UPDATE OF project, claude_session_id, created_at',
+    }
+
+    # export_columnar() 的列定义：表名 -> [(列名, 类型)]，类型中 'dict' 表示字典编码的字符串列
+    COLUMNAR_SCHEMAS = {
+        'ai_responses': [
+            ('id', 'int64'), ('claude_session_id', 'string'), ('sdk_session_id', 'string'),
+            ('project', 'dict'), ('prompt_number', 'int64'), ('response_text', 'string'),
+            ('response_type', 'dict'), ('tool_name', 'dict'), ('tool_input', 'string'),
+            ('tool_output', 'string'), ('created_at', 'string'), ('created_at_epoch', 'int64'),
+        ],
+        'tool_executions': [
+            ('id', 'int64'), ('ai_response_id', 'int64'), ('claude_session_id', 'string'),
+            ('project', 'dict'), ('prompt_number', 'int64'), ('tool_name', 'dict'),
+            ('tool_input', 'string'), ('tool_output', 'string'), ('tool_duration_ms', 'int64'),
+            ('files_created', 'string'), ('files_modified', 'string'), ('files_read', 'string'),
+            ('files_deleted', 'string'), ('error_message', 'string'), ('success', 'bool'),
+            ('created_at', 'string'), ('created_at_epoch', 'int64'),
+        ],
+    }
+
+    # get_tool_execution_stats() 支持的分组维度：名称 -> (分组表达式, 输出表达式)
+    # 按天分组时先用整数天数分组，只在输出时转换为日期字符串
+    TOOL_STATS_DIMENSIONS = {
+        'tool_name': ('tool_name', 'tool_name'),
+        'project': ('project', 'project'),
+        'day': ('created_at_epoch / 86400000', "date(day * 86400, 'unixepoch')"),
+    }
+
+    # changes_since() 同步的表及其查询构建器中的表别名，按此顺序输出
+    # （工具执行记录引用AI回复，先输出被引用的表）
+    CHANGE_FEED_TABLES = {
+        'ai_responses': '',
+        'user_prompts': 'up.',
+        'tool_executions': '',
+    }
+
+    # ensure_indexes() 创建的复合索引：索引名 -> (表名, 索引列)
+    # 以 created_at_epoch 结尾，配合隐含的 rowid 可以反向扫描直接满足
+    # ORDER BY created_at_epoch DESC, id DESC，不再需要临时B树排序
+    QUERY_INDEXES = {
+        'idx_ai_responses_project_created': ('ai_responses', ['project', 'created_at_epoch']),
+        'idx_ai_responses_project_type_created': ('ai_responses', ['project', 'response_type', 'created_at_epoch']),
+        'idx_ai_responses_created': ('ai_responses', ['created_at_epoch']),
+        'idx_tool_executions_tool_created': ('tool_executions', ['tool_name', 'created_at_epoch']),
+        'idx_tool_executions_project_created': ('tool_executions', ['project', 'created_at_epoch']),
+        # 按项目查询用户对话：先由项目找到会话，再按会话取其对话
+        'idx_sdk_sessions_project_session': ('sdk_sessions', ['project', 'claude_session_id']),
+        'idx_user_prompts_session_created': ('user_prompts', ['claude_session_id', 'created_at_epoch']),
+    }
+
+    def __init__(
+        self,
+        db_path: str = None,
+        read_only: bool = False,
+        pool_size: int = 0,
+        busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS
+    ):
+        """初始化数据库连接
+        
+        Args:
+            db_path: 数据库路径，默认 ~/.claude-mem/claude-mem.db
+            read_only: 以只读模式 (mode=ro, query_only) 打开主连接
+            pool_size: 大于0时创建只读连接池，供多线程通过 reader() 并发查询
+            busy_timeout_ms: 遇到锁时的等待时间
+        """
         if db_path is None:
             import os
             db_path = os.path.expanduser("~/.claude-mem/claude-mem.db")
         
         self.db_path = db_path
+        self.read_only = read_only
+        self.pool = None
+        self._fts_ready = set()
+        self._fts_missing = set()
+        self._fts_failed = set()
+        self._index_names = None
         
         # 检查数据库文件是否存在
         import os
@@ -27,21 +358,238 @@ class ClaudeMemDB:
             print("   请确保Claude-Mem已运行并创建了数据库")
         
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row  # 允许按列名访问
+            self.conn = open_connection(self.db_path, read_only=read_only, busy_timeout_ms=busy_timeout_ms)
+            if pool_size > 0:
+                self.pool = ConnectionPool(self.db_path, size=pool_size, busy_timeout_ms=busy_timeout_ms)
             print(f"✅ 成功连接到数据库: {self.db_path}")
         except sqlite3.Error as e:
             print(f"❌ 数据库连接失败: {e}")
             raise
 
+    def __enter__(self) -> 'ClaudeMemDB':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @contextmanager
+    def reader(self, timeout: float = None) -> Iterator['ClaudeMemDB']:
+        """
+        借用一个只读池连接，返回绑定该连接的 ClaudeMemDB 视图
+        
+        每个线程在自己的 with 块中使用返回的视图即可并发查询：
+        
+            with db.reader() as r:
+                rows = r.search_ai_responses(project='my-project')
+        
+        未启用连接池时直接返回自身。视图无需也不应调用 close()。
+        """
+        if self.pool is None:
+            yield self
+            return
+        
+        with self.pool.connection(timeout) as conn:
+            view = copy.copy(self)
+            view.conn = conn
+            view.pool = None
+            view.read_only = True
+            yield view
+
     def close(self):
         """关闭数据库连接"""
+        if self.pool:
+            self.pool.close()
+            self.pool = None
         if self.conn:
             self.conn.close()
+            self.conn = None
             print("🔒 数据库连接已关闭")
 
+    def _create_project_stats_tables(self):
+        """创建物化的项目统计表和同步触发器（已存在时不做任何事）"""
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS project_stats (
+                project TEXT PRIMARY KEY,
+                ai_response_count INTEGER NOT NULL DEFAULT 0,
+                session_count INTEGER NOT NULL DEFAULT 0,
+                earliest_response TEXT,
+                latest_response TEXT
+            );
+            CREATE TABLE IF NOT EXISTS project_stats_sessions (
+                project TEXT NOT NULL,
+                claude_session_id TEXT NOT NULL,
+                PRIMARY KEY (project, claude_session_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS project_stats_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        # 删除或修改已汇总的记录时只做标记（开销固定），读取时回退为直接查询，由 refresh_project_stats() 重建
+        for name, event in self.PROJECT_STATS_TRIGGERS.items():
+            self.conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON ai_responses
+                WHEN old.id <= (SELECT value FROM project_stats_state WHERE key = 'ai_responses_max_id')
+                BEGIN
+                    INSERT INTO project_stats_state (key, value) VALUES ('dirty', 1)
+                    ON CONFLICT(key) DO UPDATE SET value = 1;
+                END
+            """)
+
+    def _project_stats_high_water_mark(self) -> Optional[int]:
+        """
+        已汇总到 project_stats 的最大 ai_responses.id
+
+        统计表或同步触发器不存在、已汇总的记录被删除/修改过，或 ai_responses 被清空重建时
+        返回None，表示物化统计不可用。只读取，不修改数据库。
+        """
+        try:
+            state = {row['key']: row['value'] for row in self.conn.execute("SELECT key, value FROM project_stats_state")}
+        except sqlite3.OperationalError:
+            return None
+        if state.get('dirty') or 'ai_responses_max_id' not in state:
+            return None
+        triggers = self.conn.execute(
+            f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' for _ in self.PROJECT_STATS_TRIGGERS)})",
+            list(self.PROJECT_STATS_TRIGGERS)
+        ).fetchone()[0]
+        if triggers < len(self.PROJECT_STATS_TRIGGERS):
+            return None
+        max_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM ai_responses").fetchone()[0]
+        if max_id < state['ai_responses_max_id']:
+            return None
+        return state['ai_responses_max_id']
+
+    def refresh_project_stats(self, full: bool = False) -> int:
+        """
+        创建或更新物化统计表 project_stats（需要可写连接，读取统计时不会自动调用）
+
+        以 ai_responses.id 为高水位线，每次只聚合上次刷新之后插入的记录；
+        读取时高水位线之后的新记录实时汇总，因此统计始终准确，定期刷新只是
+        让这部分保持很小。已汇总的记录被删除或修改时由触发器标记，之后的读取
+        回退为直接查询，下次刷新时自动完整重建。
+
+        Args:
+            full: 丢弃已有统计并从头重建
+
+        Returns:
+            本次汇总的AI回复条数
+        """
+        if self.read_only:
+            print("⚠️  只读连接无法刷新项目统计")
+            return 0
+        
+        self._create_project_stats_tables()
+        with self.conn:
+            high_water_mark = self._project_stats_high_water_mark()
+            max_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM ai_responses").fetchone()['max_id']
+            
+            if high_water_mark is None or full:
+                full = True
+                high_water_mark = 0
+                self.conn.execute("DELETE FROM project_stats")
+                self.conn.execute("DELETE FROM project_stats_sessions")
+                self.conn.execute("DELETE FROM project_stats_state")
+            elif max_id == high_water_mark:
+                return 0
+            
+            # 项目为NULL的记录归入 UNASSIGNED_PROJECT，只计入总体统计
+            self.conn.execute("""
+                INSERT OR IGNORE INTO project_stats_sessions (project, claude_session_id)
+                SELECT DISTINCT COALESCE(project, ?), claude_session_id
+                FROM ai_responses
+                WHERE id > ? AND id <= ? AND claude_session_id IS NOT NULL
+            """, (self.UNASSIGNED_PROJECT, high_water_mark, max_id))
+            
+            deltas = self.conn.execute("""
+                SELECT COALESCE(project, ?) AS project, COUNT(*) AS n,
+                       MIN(created_at) AS earliest, MAX(created_at) AS latest
+                FROM ai_responses
+                WHERE id > ? AND id <= ?
+                GROUP BY COALESCE(project, ?)
+            """, (self.UNASSIGNED_PROJECT, high_water_mark, max_id, self.UNASSIGNED_PROJECT)).fetchall()
+            
+            self.conn.executemany("""
+                INSERT INTO project_stats (project, ai_response_count, earliest_response, latest_response)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(project) DO UPDATE SET
+                    ai_response_count = ai_response_count + excluded.ai_response_count,
+                    earliest_response = MIN(COALESCE(earliest_response, excluded.earliest_response), excluded.earliest_response),
+                    latest_response = MAX(COALESCE(latest_response, excluded.latest_response), excluded.latest_response)
+            """, [(row['project'], row['n'], row['earliest'], row['latest']) for row in deltas])
+            
+            self.conn.executemany("""
+                UPDATE project_stats
+                SET session_count = (SELECT COUNT(*) FROM project_stats_sessions s WHERE s.project = project_stats.project)
+                WHERE project = ?
+            """, [(row['project'],) for row in deltas])
+            
+            self.conn.execute("""
+                INSERT INTO project_stats_state (key, value) VALUES ('ai_responses_max_id', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (max_id,))
+        
+        return sum(row['n'] for row in deltas)
+
+    def _merged_project_stats(self, high_water_mark: int, project: str = None) -> Tuple[str, List[Any]]:
+        """
+        按项目合并物化统计与高水位线之后新增记录的实时汇总，返回 (查询, 参数)
+
+        新记录中已在 project_stats_sessions 里出现过的会话不重复计数。
+        """
+        project_filter = " AND COALESCE(a.project, ?) = ?" if project else ""
+        stats_filter = " WHERE project = ?" if project else ""
+        query = f"""
+            SELECT project,
+                   SUM(ai_response_count) AS ai_response_count,
+                   SUM(session_count) AS session_count,
+                   MIN(earliest_response) AS earliest_response,
+                   MAX(latest_response) AS latest_response
+            FROM (
+                SELECT project, ai_response_count, session_count, earliest_response, latest_response
+                FROM project_stats{stats_filter}
+                UNION ALL
+                SELECT COALESCE(a.project, ?) AS project,
+                       COUNT(*),
+                       COUNT(DISTINCT CASE WHEN NOT EXISTS (
+                           SELECT 1 FROM project_stats_sessions s
+                           WHERE s.project = COALESCE(a.project, ?) AND s.claude_session_id = a.claude_session_id
+                       ) THEN a.claude_session_id END),
+                       MIN(a.created_at),
+                       MAX(a.created_at)
+                FROM ai_responses a
+                WHERE a.id > ?{project_filter}
+                GROUP BY COALESCE(a.project, ?)
+            )
+            GROUP BY project
+        """
+        params = [project] if project else []
+        params.extend([self.UNASSIGNED_PROJECT, self.UNASSIGNED_PROJECT, high_water_mark])
+        if project:
+            params.extend([self.UNASSIGNED_PROJECT, project])
+        params.append(self.UNASSIGNED_PROJECT)
+        return query, params
+
+    def _project_stats_ready(self) -> Optional[int]:
+        """物化统计可用时返回高水位线，否则返回None（调用方直接查询ai_responses）"""
+        try:
+            return self._project_stats_high_water_mark()
+        except sqlite3.Error as e:
+            print(f"⚠️  项目统计表不可用，直接查询ai_responses: {e}")
+            return None
+
     def get_projects(self) -> List[str]:
         """获取所有项目列表"""
+        high_water_mark = self._project_stats_ready()
+        if high_water_mark is not None:
+            cursor = self.conn.execute("""
+                SELECT project FROM project_stats WHERE project != ?
+                UNION
+                SELECT project FROM ai_responses WHERE id > ? AND project IS NOT NULL
+                ORDER BY project
+            """, (self.UNASSIGNED_PROJECT, high_water_mark))
+            return [row['project'] for row in cursor.fetchall()]
+        
         cursor = self.conn.execute("""
             SELECT DISTINCT project 
             FROM ai_responses 
@@ -51,7 +599,40 @@ class ClaudeMemDB:
         return [row['project'] for row in cursor.fetchall()]
 
     def get_project_stats(self, project: str = None) -> Dict[str, Any]:
-        """获取项目统计信息"""
+        """获取项目统计信息（物化统计表 project_stats 可用时读取它）"""
+        high_water_mark = self._project_stats_ready()
+        if high_water_mark is not None:
+            if project:
+                query, params = self._merged_project_stats(high_water_mark, project)
+                row = self.conn.execute(query, params).fetchone()
+                if row is None:
+                    return {
+                        'ai_response_count': 0,
+                        'session_count': 0,
+                        'earliest_response': None,
+                        'latest_response': None
+                    }
+                result = dict(row)
+                del result['project']
+                return result
+            
+            query, params = self._merged_project_stats(high_water_mark)
+            row = self.conn.execute(f"""
+                SELECT 
+                    COALESCE(SUM(ai_response_count), 0) as ai_response_count,
+                    (
+                        SELECT COUNT(DISTINCT claude_session_id) FROM (
+                            SELECT claude_session_id FROM project_stats_sessions
+                            UNION
+                            SELECT claude_session_id FROM ai_responses WHERE id > ?
+                        )
+                    ) as session_count,
+                    MIN(earliest_response) as earliest_response,
+                    MAX(latest_response) as latest_response
+                FROM ({query})
+            """, [high_water_mark] + params).fetchone()
+            return dict(row)
+        
         if project:
             cursor = self.conn.execute("""
                 SELECT 
@@ -75,28 +656,39 @@ class ClaudeMemDB:
         result = cursor.fetchone()
         return dict(result)
 
-    def search_ai_responses(
-        self, 
-        keywords: List[str] = None, 
+    def get_all_project_stats(self) -> List[Dict[str, Any]]:
+        """一次返回所有项目的统计信息（按项目名排序），适合项目总览页"""
+        high_water_mark = self._project_stats_ready()
+        if high_water_mark is not None:
+            query, params = self._merged_project_stats(high_water_mark)
+            cursor = self.conn.execute(f"""
+                SELECT * FROM ({query})
+                WHERE project != ?
+                ORDER BY project
+            """, params + [self.UNASSIGNED_PROJECT])
+        else:
+            cursor = self.conn.execute("""
+                SELECT 
+                    project,
+                    COUNT(*) as ai_response_count,
+                    COUNT(DISTINCT claude_session_id) as session_count,
+                    MIN(created_at) as earliest_response,
+                    MAX(created_at) as latest_response
+                FROM ai_responses
+                WHERE project IS NOT NULL
+                GROUP BY project
+                ORDER BY project
+            """)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def _build_ai_responses_query(
+        self,
+        keywords: List[str] = None,
         logic: str = 'AND',
         project: str = None,
-        limit: int = 100,
-        offset: int = 0,
         response_type: str = None
-    ) -> List[Dict[str, Any]]:
-        """
-        搜索AI回复
-        
-        Args:
-            keywords: 关键字列表
-            logic: 'AND' 或 'OR'，关键字匹配逻辑
-            project: 项目名称过滤
-            limit: 返回记录数限制
-            offset: 偏移量
-            response_type: 回复类型过滤 ('assistant', 'tool_result', 'error')
-        """
-        
-        # 构建基础查询
+    ) -> Tuple[str, List[Any]]:
+        """构建AI回复查询（不含排序和分页）"""
         query = """
             SELECT 
                 id, claude_session_id, sdk_session_id, project, prompt_number,
@@ -120,6 +712,12 @@ class ClaudeMemDB:
         
         # 添加关键字搜索
         if keywords:
+            # 先用 trigram 索引缩小候选，再由LIKE精确匹配
+            prefilter = self._trigram_prefilter('ai_responses', keywords, logic)
+            if prefilter:
+                query += f" AND {prefilter[0]}"
+                params.extend(prefilter[1])
+            
             if logic.upper() == 'AND':
                 # AND逻辑：所有关键字都必须匹配
                 for keyword in keywords:
@@ -133,118 +731,694 @@ class ClaudeMemDB:
                     params.append(f"%{keyword}%")
                 query += f" AND ({' OR '.join(or_conditions)})"
         
+        return query, params
+
+    def _iter_rows(
+        self,
+        query: str,
+        params: List[Any],
+        batch_size: int = None
+    ) -> Iterator[sqlite3.Row]:
+        """按批次从游标读取行，避免一次性fetchall占用大量内存"""
+        cursor = self.conn.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size or self.DEFAULT_BATCH_SIZE)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _apply_cursor(
+        query: str,
+        params: List[Any],
+        cursor: Optional[str],
+        alias: str = ''
+    ) -> str:
+        """追加键集分页条件：只返回排在游标之后的记录
+
+        与 ORDER BY created_at_epoch DESC, id DESC 配合使用，SQLite可以直接
+        在索引上定位起点，而不必像 OFFSET 那样逐行扫描并丢弃前面的记录。
+        """
+        if not cursor:
+            return query
+        epoch, row_id = decode_cursor(cursor)
+        params.extend([epoch, row_id])
+        return query + f" AND ({alias}created_at_epoch, {alias}id) < (?, ?)"
+
+    @staticmethod
+    def _build_fts_query(keywords: List[str], logic: str = 'AND') -> str:
+        """构建FTS5 MATCH表达式，每个关键字作为短语并转义双引号"""
+        operator = ' AND ' if logic.upper() == 'AND' else ' OR '
+        return operator.join('"{}"'.format(keyword.replace('"', '""')) for keyword in keywords)
+
+    def ensure_fts_index(self, table: str) -> bool:
+        """
+        确保源表的FTS5索引存在，缺失时创建、回填并添加同步触发器
+        
+        Args:
+            table: 源表名，见 FTS_INDEXES
+        
+        Returns:
+            索引可用返回True；只读连接下缺失或创建失败时返回False
+        """
+        fts_table, columns = self.FTS_INDEXES[table]
+        return self._ensure_fts(table, fts_table, columns)
+
+    def ensure_trigram_index(self, table: str) -> bool:
+        """
+        确保源表的 trigram FTS5 索引存在，缺失时创建、回填并添加同步触发器
+
+        trigram 分词器把文本切成所有相邻的三字符组合，短语查询即子串查询，
+        用作 LIKE '%关键字%' 的候选过滤。只使用SQL触发器同步，worker 写入时同样生效。
+        回填在一个写事务中完成，大库上耗时较长，因此搜索不会自动创建，需要显式调用。
+
+        Args:
+            table: 源表名，见 TRIGRAM_INDEXES
+        """
+        fts_table, columns = self.TRIGRAM_INDEXES[table]
+        return self._ensure_fts(table, fts_table, columns, tokenize='trigram')
+
+    def ensure_trigram_indexes(self, tables: List[str] = None) -> List[str]:
+        """
+        创建 TRIGRAM_INDEXES 中缺失的 trigram 索引，之后的 LIKE 关键字搜索会自动使用
+
+        需要 SQLite 3.34+（trigram 分词器）。只读连接下不做任何修改。
+
+        Args:
+            tables: 源表名列表，默认全部
+
+        Returns:
+            本次新创建的索引名列表
+        """
+        if self.read_only:
+            print("⚠️  只读连接无法创建索引")
+            return []
+
+        created = []
+        for table in tables or list(self.TRIGRAM_INDEXES):
+            fts_table, _ = self.TRIGRAM_INDEXES[table]
+            if self._trigram_ready(table):
+                continue
+            if self.ensure_trigram_index(table):
+                created.append(fts_table)
+        return created
+
+    def _trigram_ready(self, table: str) -> bool:
+        """trigram 索引是否已存在（不会创建）；存在时记入 _fts_ready"""
+        fts_table, _ = self.TRIGRAM_INDEXES[table]
+        if fts_table not in self._fts_ready and self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (fts_table,)
+        ).fetchone():
+            self._fts_ready.add(fts_table)
+        return fts_table in self._fts_ready
+
+    def _ensure_fts(self, table: str, fts_table: str, columns: List[str], tokenize: str = None) -> bool:
+        """创建外部内容FTS5索引（ensure_fts_index / ensure_trigram_index 的实现）"""
+        if fts_table in self._fts_ready:
+            return True
+        if fts_table in self._fts_failed:
+            # 创建失败（例如 SQLite 版本不支持该分词器）不再重试
+            return False
+        
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (fts_table,)
+        ).fetchone()
+        
+        if not exists and self.read_only:
+            # 只读连接无法建索引，只提示一次
+            if fts_table not in self._fts_missing:
+                self._fts_missing.add(fts_table)
+                print(f"⚠️  只读连接无法创建FTS索引 {fts_table}，回退到LIKE搜索")
+            return False
+        
+        if not exists:
+            cols = ', '.join(columns)
+            new_cols = ', '.join(f'new.{c}' for c in columns)
+            old_cols = ', '.join(f'old.{c}' for c in columns)
+            print(f"🔧 创建FTS索引: {fts_table}")
+            try:
+                with self.conn:
+                    self.conn.execute(f"""
+                        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                            {cols},
+                            content='{table}',
+                            content_rowid='id'{f", tokenize='{tokenize}'" if tokenize else ''}
+                        )
+                    """)
+                    # 回填已有数据
+                    self.conn.execute(f"""
+                        INSERT INTO {fts_table}(rowid, {cols})
+                        SELECT id, {cols} FROM {table}
+                    """)
+                    self.conn.execute(f"""
+                        CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN
+                            INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_cols});
+                        END
+                    """)
+                    self.conn.execute(f"""
+                        CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN
+                            INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                        END
+                    """)
+                    self.conn.execute(f"""
+                        CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE ON {table} BEGIN
+                            INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                            INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_cols});
+                        END
+                    """)
+            except sqlite3.Error as e:
+                print(f"❌ 创建FTS索引失败: {e}")
+                self._fts_failed.add(fts_table)
+                return False
+        
+        self._fts_ready.add(fts_table)
+        return True
+
+    def _trigram_prefilter(
+        self,
+        table: str,
+        keywords: List[str],
+        logic: str = 'AND',
+        alias: str = ''
+    ) -> Optional[Tuple[str, List[Any]]]:
+        """
+        LIKE关键字搜索的 trigram 索引候选条件，调用方仍保留原来的LIKE条件做精确复核
+
+        trigram 短语查询按子串匹配且大小写折叠范围比LIKE更宽，候选集一定包含
+        LIKE的全部结果。关键字按LIKE通配符 (% _) 切开，至少 TRIGRAM_MIN_CHARS 个
+        字符的片段都必须出现（"ERR_042" -> "ERR" AND "042"）；没有这样片段的关键字
+        无法用索引：AND逻辑下只用其余关键字过滤，OR逻辑下放弃索引。
+        只使用已经存在的索引（由 ensure_trigram_indexes() 创建）；候选行超过
+        TRIGRAM_MAX_CANDIDATE_RATIO 时也不使用索引。无法使用索引时返回None。
+        """
+        if not keywords or table not in self.TRIGRAM_INDEXES:
+            return None
+        usable = []
+        for keyword in keywords:
+            pieces = [piece for piece in re.split('[%_]', keyword) if len(piece) >= self.TRIGRAM_MIN_CHARS]
+            if pieces:
+                usable.append(pieces)
+        if not usable or (logic.upper() != 'AND' and len(usable) < len(keywords)):
+            return None
+        if not self._trigram_ready(table):
+            return None
+        
+        fts_table, _ = self.TRIGRAM_INDEXES[table]
+        if logic.upper() == 'AND':
+            match = self._build_fts_query([piece for pieces in usable for piece in pieces], 'AND')
+        else:
+            match = ' OR '.join(f"({self._build_fts_query(pieces, 'AND')})" for pieces in usable)
+        # 常见关键字的候选集很大，取出全部候选反而比顺序扫描慢；
+        # 计数带上限，代价只与上限有关
+        total = self.conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+        max_candidates = int(total * self.TRIGRAM_MAX_CANDIDATE_RATIO)
+        candidates = self.conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {fts_table} WHERE {fts_table} MATCH ? LIMIT ?)",
+            (match, max_candidates + 1)
+        ).fetchone()[0]
+        if candidates > max_candidates:
+            return None
+        
+        condition = f"{alias}id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)"
+        return condition, [match]
+
+    def _cjk_high_water_mark(self, fts_table: str) -> Optional[int]:
+        """二元组索引中的最大id；索引不存在时返回None"""
+        try:
+            row = self.conn.execute(f"SELECT rowid FROM {fts_table} ORDER BY rowid DESC LIMIT 1").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else 0
+
+    def refresh_cjk_index(self, table: str, full: bool = False, batch_size: int = 2000) -> int:
+        """
+        创建或增量更新中文二元组FTS索引，返回本次索引的记录数
+
+        正文经 cjk_bigram_text() 转换后写入无内容FTS5表，只索引id大于
+        已索引最大id的记录。worker 写入时不会更新该索引（SQLite触发器
+        无法调用Python分词），查询时未索引的新记录回退到LIKE匹配。
+        修改或删除历史记录后请使用 full=True 重建。
+
+        Args:
+            table: 源表名，见 CJK_FTS_INDEXES
+            full: 清空后重建
+            batch_size: 每批写入的记录数
+        """
+        if self.read_only:
+            return 0
+        
+        fts_table, column = self.CJK_FTS_INDEXES[table]
+        high_water_mark = self._cjk_high_water_mark(fts_table)
+        if high_water_mark is None:
+            print(f"🔧 创建中文二元组索引: {fts_table}")
+            self.conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(text, content='')")
+            high_water_mark = 0
+        
+        with self.conn:
+            if full:
+                self.conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('delete-all')")
+                high_water_mark = 0
+            
+            cursor = self.conn.execute(f"SELECT id, {column} FROM {table} WHERE id > ? ORDER BY id", (high_water_mark,))
+            indexed = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                self.conn.executemany(
+                    f"INSERT INTO {fts_table}(rowid, text) VALUES (?, ?)",
+                    [(row[0], cjk_bigram_text(row[1])) for row in rows]
+                )
+                indexed += len(rows)
+        return indexed
+
+    def ensure_cjk_index(self, table: str) -> Optional[int]:
+        """
+        创建或增量更新中文二元组索引（可写连接），返回已索引的最大id
+
+        搜索只读取已有的索引，不会创建或更新；新记录积累较多时定期调用本方法
+        （或 ensure_cjk_indexes()），否则未索引的部分回退到LIKE匹配。
+
+        Returns:
+            已索引的最大id；索引不可用时返回None
+        """
+        fts_table, _ = self.CJK_FTS_INDEXES[table]
+        if not self.read_only:
+            try:
+                self.refresh_cjk_index(table)
+            except sqlite3.Error as e:
+                print(f"❌ 更新中文二元组索引失败: {e}")
+        return self._cjk_high_water_mark(fts_table)
+
+    def ensure_cjk_indexes(self, tables: List[str] = None) -> List[str]:
+        """
+        创建缺失的中文二元组索引并增量补齐已有索引，之后 use_fts 搜索会使用它们
+
+        只读连接下不做任何修改。
+
+        Args:
+            tables: 源表名列表，默认 CJK_FTS_INDEXES 中的全部
+
+        Returns:
+            本次新创建的索引名列表
+        """
+        if self.read_only:
+            print("⚠️  只读连接无法创建索引")
+            return []
+
+        created = []
+        for table in tables or list(self.CJK_FTS_INDEXES):
+            fts_table, _ = self.CJK_FTS_INDEXES[table]
+            existed = self._cjk_high_water_mark(fts_table) is not None
+            if self.ensure_cjk_index(table) is not None and not existed:
+                created.append(fts_table)
+        return created
+
+    @staticmethod
+    def _contains_cjk(keywords: List[str]) -> bool:
+        """关键字是否含有汉字（默认FTS分词器无法按子串匹配汉字）"""
+        return any(_CJK_PATTERN.search(keyword) for keyword in keywords)
+
+    @staticmethod
+    def _bigram_matchable(keywords: List[str]) -> bool:
+        """关键字能否用二元组索引匹配：单个汉字无法组成二字组"""
+        runs = [token for keyword in keywords for token in _TOKEN_PATTERN.findall(keyword) if _CJK_PATTERN.match(token)]
+        return all(len(run) > 1 for run in runs)
+
+    @staticmethod
+    def _build_cjk_fts_query(keywords: List[str], logic: str = 'AND') -> str:
+        """构建二元组索引的MATCH表达式，每个关键字转换为二字组短语"""
+        operator = ' AND ' if logic.upper() == 'AND' else ' OR '
+        return operator.join('"{}"'.format(cjk_bigram_text(keyword).replace('"', '""')) for keyword in keywords)
+
+    def _cjk_match(
+        self,
+        table: str,
+        keywords: List[str],
+        logic: str = 'AND',
+        alias: str = ''
+    ) -> Optional[Tuple[str, List[Any]]]:
+        """
+        use_fts 搜索的二元组索引匹配条件：已索引的记录走索引，之后的新记录用LIKE
+
+        二元组索引把汉字与相邻的英文分开（"React组件" -> "React 组件"），
+        因此英文关键字也走该索引；默认分词器会把整段 "React组件" 当作一个词。
+        只使用已经存在的索引；索引不存在或关键字含单个汉字时返回None。
+        """
+        if not keywords or table not in self.CJK_FTS_INDEXES or not self._bigram_matchable(keywords):
+            return None
+        fts_table, column = self.CJK_FTS_INDEXES[table]
+        high_water_mark = self._cjk_high_water_mark(fts_table)
+        if high_water_mark is None:
+            if fts_table not in self._fts_missing:
+                self._fts_missing.add(fts_table)
+                print(f"⚠️  中文二元组索引 {fts_table} 不存在（见 ensure_cjk_indexes()）："
+                      f"含汉字的关键字回退到LIKE，与汉字相连的英文词无法通过FTS匹配")
+            return None
+        
+        operator = ' AND ' if logic.upper() == 'AND' else ' OR '
+        likes = operator.join(f"{alias}{column} LIKE ?" for _ in keywords)
+        condition = (
+            f"({alias}id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)"
+            f" OR ({alias}id > ? AND ({likes})))"
+        )
+        params = [self._build_cjk_fts_query(keywords, logic), high_water_mark]
+        params.extend(f"%{keyword}%" for keyword in keywords)
+        return condition, params
+
+    def _table_columns(self, table: str) -> set:
+        """返回表的列名集合，表不存在时为空集合"""
+        return {row['name'] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+
+    def explain(self, query: str, params: List[Any] = ()) -> List[str]:
+        """返回查询的 EXPLAIN QUERY PLAN 明细（每个步骤一行）"""
+        cursor = self.conn.execute(f"EXPLAIN QUERY PLAN {query}", list(params))
+        return [row['detail'] for row in cursor.fetchall()]
+
+    def _index_probe_queries(self) -> Dict[str, Tuple[str, List[Any]]]:
+        """复合索引所针对的典型列表查询，用于对比索引前后的查询计划"""
+        probes = {}
+
+        query, params = self._build_ai_responses_query(project='?')
+        probes['ai_responses by project'] = (query + " ORDER BY created_at_epoch DESC, id DESC LIMIT 100", params)
+
+        query, params = self._build_ai_responses_query(project='?', response_type='?')
+        probes['ai_responses by project+type'] = (query + " ORDER BY created_at_epoch DESC, id DESC LIMIT 100", params)
+
+        query, params = self._build_ai_responses_query()
+        probes['ai_responses latest'] = (query + " ORDER BY created_at_epoch DESC, id DESC LIMIT 100", params)
+
+        query, params = self._build_tool_executions_query(tool_name='?')
+        probes['tool_executions by tool'] = (query + " ORDER BY created_at_epoch DESC, id DESC LIMIT 100", params)
+
+        query, params = self._build_tool_executions_query(project='?')
+        probes['tool_executions by project'] = (query + " ORDER BY created_at_epoch DESC, id DESC LIMIT 100", params)
+
+        query, params = self._build_user_prompts_query(project='?')
+        probes['user_prompts by project'] = (query + " ORDER BY up.created_at_epoch DESC, up.id DESC LIMIT 100", params)
+
+        return probes
+
+    def ensure_indexes(self) -> List[str]:
+        """
+        创建 QUERY_INDEXES 中缺失的复合索引
+
+        源表缺少索引列时（旧版表结构）跳过该索引。只读连接下不做任何修改。
+
+        Returns:
+            本次新创建的索引名列表
+        """
+        if self.read_only:
+            print("⚠️  只读连接无法创建索引")
+            return []
+
+        existing = {row['name'] for row in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='index'"
+        )}
+        columns_by_table = {}
+        created = []
+
+        for name, (table, columns) in self.QUERY_INDEXES.items():
+            if name in existing:
+                continue
+            if table not in columns_by_table:
+                columns_by_table[table] = self._table_columns(table)
+            missing = [c for c in columns if c not in columns_by_table[table]]
+            if missing:
+                print(f"⚠️  跳过索引 {name}: {table} 缺少列 {', '.join(missing)}")
+                continue
+
+            print(f"🔧 创建索引: {name}")
+            try:
+                with self.conn:
+                    self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)})")
+                created.append(name)
+            except sqlite3.Error as e:
+                print(f"❌ 创建索引失败: {e}")
+
+        self._index_names = None
+        return created
+
+    def optimize(self, analyze: bool = True) -> Dict[str, Any]:
+        """
+        创建复合索引并更新统计信息，报告典型查询在优化前后的查询计划
+
+        Args:
+            analyze: 是否对相关表执行 ANALYZE，让查询规划器使用新索引的统计信息
+
+        Returns:
+            {'created': [索引名], 'plans': {查询名: {'before': [...], 'after': [...]}}}
+        """
+        plans = {}
+
+        for name, (query, params) in self._index_probe_queries().items():
+            try:
+                plans[name] = {'before': self.explain(query, params)}
+            except sqlite3.Error as e:
+                # 旧版表结构缺少过滤列
+                print(f"⚠️  无法分析查询 {name}: {e}")
+
+        created = self.ensure_indexes()
+
+        if analyze and not self.read_only:
+            try:
+                with self.conn:
+                    for table in sorted({table for table, _ in self.QUERY_INDEXES.values()}):
+                        if self._table_columns(table):
+                            self.conn.execute(f"ANALYZE {table}")
+            except sqlite3.Error as e:
+                print(f"❌ ANALYZE 失败: {e}")
+
+        # 查询本身可能随索引改变（如用户对话的项目过滤改走JOIN），重新生成
+        probes = self._index_probe_queries()
+        for name, plan in plans.items():
+            query, params = probes[name]
+            plan['after'] = self.explain(query, params)
+            full_scan = any(step.startswith('SCAN') and 'INDEX' not in step for step in plan['after'])
+            status = "⚠️ " if full_scan else "✅"
+            print(f"{status} {name}: {'; '.join(plan['after'])}")
+            if plan['after'] != plan['before']:
+                print(f"      之前: {'; '.join(plan['before'])}")
+
+        return {'created': created, 'plans': plans}
+
+    @staticmethod
+    def next_cursor(rows: List[Any]) -> Optional[str]:
+        """根据一页结果的最后一条记录生成下一页游标，空页返回None"""
+        if not rows:
+            return None
+        last = rows[-1]
+        return encode_cursor(last['created_at_epoch'], last['id'])
+
+    def search_ai_responses(
+        self, 
+        keywords: List[str] = None, 
+        logic: str = 'AND',
+        project: str = None,
+        limit: int = 100,
+        offset: int = 0,
+        response_type: str = None,
+        cursor: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        搜索AI回复
+        
+        Args:
+            keywords: 关键字列表
+            logic: 'AND' 或 'OR'，关键字匹配逻辑
+            project: 项目名称过滤
+            limit: 返回记录数限制
+            offset: 偏移量（深度翻页请使用cursor）
+            response_type: 回复类型过滤 ('assistant', 'tool_result', 'error')
+            cursor: 分页游标，取自上一页的 next_cursor(results)
+        """
+        query, params = self._build_ai_responses_query(keywords, logic, project, response_type)
+        query = self._apply_cursor(query, params, cursor)
+        
         # 添加排序和限制
-        query += " ORDER BY created_at_epoch DESC LIMIT ? OFFSET ?"
+        query += " ORDER BY created_at_epoch DESC, id DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
         try:
             cursor = self.conn.execute(query, params)
-            results = []
-            for row in cursor.fetchall():
-                results.append({
-                    'id': row['id'],
-                    'claude_session_id': row['claude_session_id'],
-                    'sdk_session_id': row['sdk_session_id'],
-                    'project': row['project'],
-                    'prompt_number': row['prompt_number'],
-                    'response_text': row['response_text'],
-                    'response_type': row['response_type'],
-                    'tool_name': row['tool_name'],
-                    'tool_input': row['tool_input'],
-                    'tool_output': row['tool_output'],
-                    'created_at': row['created_at'],
-                    'created_at_epoch': row['created_at_epoch']
-                })
-            return results
+            return [dict(row) for row in cursor.fetchall()]
         except sqlite3.Error as e:
             print(f"❌ 查询失败: {e}")
             return []
 
-    def get_user_prompts(
+    def iter_ai_responses(
         self,
+        keywords: List[str] = None,
+        logic: str = 'AND',
         project: str = None,
-        limit: int = 100,
-        offset: int = 0
-    ) -> List[Dict[str, Any]]:
-        """获取用户对话"""
-        if not self.conn:
-            return []
+        response_type: str = None,
+        limit: int = None,
+        batch_size: int = None,
+        cursor: str = None
+    ) -> Iterator[sqlite3.Row]:
+        """
+        流式遍历AI回复（search_ai_responses的生成器版本）
+        
+        按 batch_size 批量 fetchmany，逐行产出 sqlite3.Row（支持 row['列名'] 访问，
+        需要字典时可 dict(row)），内存占用与结果集大小无关。
+        
+        Args:
+            keywords: 关键字列表
+            logic: 'AND' 或 'OR'，关键字匹配逻辑
+            project: 项目名称过滤
+            response_type: 回复类型过滤
+            limit: 返回记录数限制，None 表示不限制
+            batch_size: 每批读取行数，默认 DEFAULT_BATCH_SIZE
+            cursor: 从该分页游标之后开始遍历
+        """
+        query, params = self._build_ai_responses_query(keywords, logic, project, response_type)
+        query = self._apply_cursor(query, params, cursor)
+        query += " ORDER BY created_at_epoch DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
         
+        try:
+            yield from self._iter_rows(query, params, batch_size)
+        except sqlite3.Error as e:
+            print(f"❌ 查询失败: {e}")
+
+    def _has_index(self, name: str) -> bool:
+        """索引是否存在（结果缓存，ensure_indexes() 后刷新）"""
+        if self._index_names is None:
+            self._index_names = {row['name'] for row in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index'"
+            )}
+        return name in self._index_names
+
+    def _build_user_prompts_query(
+        self,
+        project: str = None,
+        keywords: List[str] = None,
+        logic: str = 'AND',
+        use_fts: bool = False
+    ) -> Tuple[str, List[Any]]:
+        """构建用户对话查询（不含排序和分页），表别名为 up"""
         query = """
             SELECT 
-                id, claude_session_id, prompt_number, prompt_text,
-                created_at, created_at_epoch
-            FROM user_prompts
-            WHERE 1=1
+                up.id, up.claude_session_id, up.prompt_number, up.prompt_text,
+                up.created_at, up.created_at_epoch
+            FROM user_prompts up
         """
         
         params = []
         
-        if project:
-            # 通过claude_session_id关联项目
-            query += " AND claude_session_id IN (SELECT claude_session_id FROM sdk_sessions WHERE project = ?)"
+        # 通过claude_session_id关联项目
+        if project and self._has_index('idx_user_prompts_session_created'):
+            # 从项目的会话出发按会话索引取对话，开销与项目规模成正比
+            query += """
+            JOIN sdk_sessions s ON s.claude_session_id = up.claude_session_id
+            WHERE s.project = ?
+            """
             params.append(project)
+        elif project:
+            # 缺少会话索引时JOIN会逐行探测sdk_sessions，IN子查询扫描更快
+            query += " WHERE up.claude_session_id IN (SELECT claude_session_id FROM sdk_sessions WHERE project = ?)"
+            params.append(project)
+        else:
+            query += " WHERE 1=1"
+        
+        # 关键字搜索：use_fts 时优先走二元组索引；含汉字但没有二元组索引时只能用LIKE
+        cjk_match = self._cjk_match('user_prompts', keywords, logic, 'up.') if use_fts else None
+        if cjk_match:
+            query += f" AND {cjk_match[0]}"
+            params.extend(cjk_match[1])
+        elif keywords and use_fts and not self._contains_cjk(keywords) and self.ensure_fts_index('user_prompts'):
+            query += " AND up.id IN (SELECT rowid FROM user_prompts_fts WHERE user_prompts_fts MATCH ?)"
+            params.append(self._build_fts_query(keywords, logic))
+        elif keywords:
+            prefilter = self._trigram_prefilter('user_prompts', keywords, logic, 'up.')
+            if prefilter:
+                query += f" AND {prefilter[0]}"
+                params.extend(prefilter[1])
+            
+            if logic.upper() == 'AND':
+                for keyword in keywords:
+                    query += " AND up.prompt_text LIKE ?"
+                    params.append(f"%{keyword}%")
+            else:
+                or_conditions = []
+                for keyword in keywords:
+                    or_conditions.append("up.prompt_text LIKE ?")
+                    params.append(f"%{keyword}%")
+                query += f" AND ({' OR '.join(or_conditions)})"
+        
+        return query, params
+
+    def get_user_prompts(
+        self,
+        project: str = None,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: str = None
+    ) -> List[Dict[str, Any]]:
+        """获取用户对话"""
+        if not self.conn:
+            return []
         
-        query += " ORDER BY created_at_epoch DESC LIMIT ? OFFSET ?"
+        query, params = self._build_user_prompts_query(project)
+        query = self._apply_cursor(query, params, cursor, alias='up.')
+        query += " ORDER BY up.created_at_epoch DESC, up.id DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
-        try:
-            cursor = self.conn.execute(query, params)
-            results = []
-            for row in cursor.fetchall():
-                results.append({
-                    'id': row['id'],
-                    'claude_session_id': row['claude_session_id'],
-                    'prompt_number': row['prompt_number'],
-                    'prompt_text': row['prompt_text'],
-                    'created_at': row['created_at'],
-                    'created_at_epoch': row['created_at_epoch']
-                })
-            return results
+        try:
+            cursor = self.conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
         except sqlite3.Error as e:
             print(f"❌ 查询用户对话失败: {e}")
             return []
 
+    def iter_user_prompts(
+        self,
+        project: str = None,
+        limit: int = None,
+        batch_size: int = None,
+        cursor: str = None
+    ) -> Iterator[sqlite3.Row]:
+        """流式遍历用户对话（get_user_prompts的生成器版本）"""
+        if not self.conn:
+            return
+        
+        query, params = self._build_user_prompts_query(project)
+        query = self._apply_cursor(query, params, cursor, alias='up.')
+        query += " ORDER BY up.created_at_epoch DESC, up.id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        try:
+            yield from self._iter_rows(query, params, batch_size)
+        except sqlite3.Error as e:
+            print(f"❌ 查询用户对话失败: {e}")
+
     def search_user_prompts_with_keywords(
         self,
         keywords: List[str],
         logic: str = 'AND',
         project: str = None,
-        limit: int = 100
+        limit: int = 100,
+        cursor: str = None,
+        use_fts: bool = False
     ) -> List[Dict[str, Any]]:
-        """搜索用户对话（支持关键字）"""
-        if not self.conn:
-            return []
+        """搜索用户对话（支持关键字）
         
-        query = """
-            SELECT 
-                id, claude_session_id, prompt_number, prompt_text,
-                created_at, created_at_epoch
-            FROM user_prompts up
-            WHERE 1=1
+        use_fts=True 时通过 user_prompts_fts 索引按词匹配（索引缺失时自动创建），
+        否则使用 LIKE 子串匹配。
         """
+        if not self.conn:
+            return []
         
-        params = []
-        
-        # 项目过滤
-        if project:
-            query += " AND up.claude_session_id IN (SELECT claude_session_id FROM sdk_sessions WHERE project = ?)"
-            params.append(project)
-        
-        # 关键字搜索
-        if keywords:
-            if logic.upper() == 'AND':
-                for keyword in keywords:
-                    query += " AND up.prompt_text LIKE ?"
-                    params.append(f"%{keyword}%")
-            else:
-                or_conditions = []
-                for keyword in keywords:
-                    or_conditions.append("up.prompt_text LIKE ?")
-                    params.append(f"%{keyword}%")
-                query += f" AND ({' OR '.join(or_conditions)})"
-        
-        query += " ORDER BY up.created_at_epoch DESC LIMIT ?"
+        query, params = self._build_user_prompts_query(project, keywords, logic, use_fts)
+        query = self._apply_cursor(query, params, cursor, alias='up.')
+        query += " ORDER BY up.created_at_epoch DESC, up.id DESC LIMIT ?"
         params.append(limit)
         
         try:
@@ -270,7 +1444,10 @@ class ClaudeMemDB:
         logic: str = 'AND',
         project: str = None,
         conversation_type: str = 'both',  # 'user', 'ai', 'both'
-        limit: int = 100
+        limit: int = 100,
+        cursors: Dict[str, str] = None,
+        ranked: bool = False,
+        snippet_tokens: int = 32
     ) -> Dict[str, List[Dict[str, Any]]]:
         """统一搜索用户对话和AI回复
         
@@ -280,7 +1457,27 @@ class ClaudeMemDB:
             project: 项目名称过滤
             conversation_type: 对话类型 ('user', 'ai', 'both')
             limit: 返回记录数限制
+            cursors: 各来源的分页游标，键为 'user_prompts' / 'ai_responses'
+            ranked: 为True时按bm25相关度合并两类结果，见 search_ranked
+            snippet_tokens: ranked模式下摘要的最大词数
+        
+        Returns:
+            默认返回 {'user_prompts': [...], 'ai_responses': [...]}；
+            ranked模式返回 {'results': [...]}
         """
+        if ranked:
+            return {
+                'results': self.search_ranked(
+                    keywords=keywords,
+                    logic=logic,
+                    project=project,
+                    conversation_type=conversation_type,
+                    limit=limit,
+                    snippet_tokens=snippet_tokens
+                )
+            }
+        
+        cursors = cursors or {}
         results = {
             'user_prompts': [],
             'ai_responses': []
@@ -292,7 +1489,8 @@ class ClaudeMemDB:
                 keywords=keywords,
                 logic=logic,
                 project=project,
-                limit=limit
+                limit=limit,
+                cursor=cursors.get('user_prompts')
             )
         
         # 搜索AI回复
@@ -301,29 +1499,242 @@ class ClaudeMemDB:
                 keywords=keywords,
                 logic=logic,
                 project=project,
-                limit=limit
+                limit=limit,
+                cursor=cursors.get('ai_responses')
             )
         
         return results
 
+    def search_ranked(
+        self,
+        keywords: List[str],
+        logic: str = 'AND',
+        project: str = None,
+        conversation_type: str = 'both',
+        limit: int = 20,
+        snippet_tokens: int = 32
+    ) -> List[Dict[str, Any]]:
+        """
+        按bm25相关度合并搜索用户对话和AI回复，只返回命中片段
+        
+        两类结果在一条 UNION ALL 查询中按 bm25 分数统一排序并共用 limit，
+        正文用 snippet() 截取命中附近的片段，不返回完整内容。
+        
+        Returns:
+            结果列表，每项包含 source ('user' 或 'ai')、id、claude_session_id、
+            project、prompt_number、snippet、score（越小越相关）、created_at、
+            created_at_epoch
+        """
+        if not keywords:
+            return []
+        
+        fts_query = self._build_fts_query(keywords, logic)
+        open_mark, close_mark, ellipsis = self.SNIPPET_MARKERS
+        snippet_args = (open_mark, close_mark, ellipsis, max(1, min(snippet_tokens, 64)))
+        
+        selects = []
+        params = []
+        
+        if conversation_type in ['user', 'both'] and self.ensure_fts_index('user_prompts'):
+            select = """
+                SELECT 
+                    'user' AS source, up.id, up.claude_session_id,
+                    (SELECT project FROM sdk_sessions s WHERE s.claude_session_id = up.claude_session_id) AS project,
+                    up.prompt_number,
+                    snippet(user_prompts_fts, -1, ?, ?, ?, ?) AS snippet,
+                    bm25(user_prompts_fts) AS score,
+                    up.created_at, up.created_at_epoch
+                FROM user_prompts_fts
+                JOIN user_prompts up ON up.id = user_prompts_fts.rowid
+                WHERE user_prompts_fts MATCH ?
+            """
+            params.extend(snippet_args)
+            params.append(fts_query)
+            if project:
+                select += " AND up.claude_session_id IN (SELECT claude_session_id FROM sdk_sessions WHERE project = ?)"
+                params.append(project)
+            selects.append(select)
+        
+        if conversation_type in ['ai', 'both'] and self.ensure_fts_index('ai_responses'):
+            select = """
+                SELECT 
+                    'ai' AS source, ar.id, ar.claude_session_id, ar.project,
+                    ar.prompt_number,
+                    snippet(ai_responses_fts, -1, ?, ?, ?, ?) AS snippet,
+                    bm25(ai_responses_fts) AS score,
+                    ar.created_at, ar.created_at_epoch
+                FROM ai_responses_fts
+                JOIN ai_responses ar ON ar.id = ai_responses_fts.rowid
+                WHERE ai_responses_fts MATCH ?
+            """
+            params.extend(snippet_args)
+            params.append(fts_query)
+            if project:
+                select += " AND ar.project = ?"
+                params.append(project)
+            selects.append(select)
+        
+        if not selects:
+            return []
+        
+        query = " UNION ALL ".join(selects) + " ORDER BY score, created_at_epoch DESC LIMIT ?"
+        params.append(limit)
+        
+        try:
+            cursor = self.conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"❌ 排序搜索失败: {e}")
+            return []
+
+    def search_ai_responses_hybrid(
+        self,
+        keywords: List[str] = None,
+        semantic_ids: List[int] = None,
+        project: str = None,
+        required_terms: List[str] = None,
+        limit: int = 10,
+        candidates: int = 50,
+        rrf_k: int = 60
+    ) -> List[Dict[str, Any]]:
+        """
+        用倒数排名融合 (RRF) 合并 bm25 关键字排名和向量相似度排名
+
+        两路候选都在一条查询中生成：关键字走FTS5按 bm25 取前 candidates 条
+        （FTS索引不可用时按时间倒序的LIKE匹配），semantic_ids 是向量搜索
+        已按相似度排好序的AI回复id。required_terms 作为过滤条件下推到两路
+        候选中（任一词作为子串出现即可，英文不区分大小写），不满足的记录
+        不占用候选名额，也不会被读出。每条记录的融合得分为
+        sum(1 / (rrf_k + 名次))。
+
+        Args:
+            keywords: 关键字，按OR匹配
+            semantic_ids: 向量搜索结果的AI回复id，按相似度降序
+            project: 项目过滤
+            required_terms: 必须包含其中至少一个词
+            limit: 返回条数
+            candidates: 每一路最多取的候选数
+            rrf_k: RRF平滑常数，越大排名靠后的结果权重相对越高
+
+        Returns:
+            AI回复列表，附带 rrf_score、lexical_rank、semantic_rank（未命中该路时为None）
+        """
+        filters = ""
+        filter_params = []
+        if project:
+            filters += " AND ar.project = ?"
+            filter_params.append(project)
+        if required_terms:
+            filters += f" AND ({' OR '.join('ar.response_text LIKE ?' for _ in required_terms)})"
+            filter_params.extend(f"%{term}%" for term in required_terms)
+        
+        sources = []
+        params = []
+        
+        # 有二元组索引时用它打分（尚未索引的新记录不参与关键字排名）；
+        # 含汉字但没有二元组索引时按时间取LIKE候选
+        use_cjk = (
+            bool(keywords) and self._bigram_matchable(keywords)
+            and self._cjk_high_water_mark(self.CJK_FTS_INDEXES['ai_responses'][0]) is not None
+        )
+        if use_cjk or (keywords and not self._contains_cjk(keywords) and self.ensure_fts_index('ai_responses')):
+            fts_table = self.CJK_FTS_INDEXES['ai_responses'][0] if use_cjk else 'ai_responses_fts'
+            sources.append(f"""
+                SELECT id, ROW_NUMBER() OVER (ORDER BY score) AS rank, 'lexical' AS source
+                FROM (
+                    SELECT ar.id, bm25({fts_table}) AS score
+                    FROM {fts_table}
+                    JOIN ai_responses ar ON ar.id = {fts_table}.rowid
+                    WHERE {fts_table} MATCH ?{filters}
+                    ORDER BY score
+                    LIMIT ?
+                )
+            """)
+            params.append(self._build_cjk_fts_query(keywords, 'OR') if use_cjk else self._build_fts_query(keywords, 'OR'))
+            params.extend(filter_params)
+            params.append(candidates)
+        elif keywords:
+            sources.append(f"""
+                SELECT id, ROW_NUMBER() OVER (ORDER BY created_at_epoch DESC, id DESC) AS rank, 'lexical' AS source
+                FROM (
+                    SELECT ar.id, ar.created_at_epoch
+                    FROM ai_responses ar
+                    WHERE ({' OR '.join('ar.response_text LIKE ?' for _ in keywords)}){filters}
+                    ORDER BY ar.created_at_epoch DESC, ar.id DESC
+                    LIMIT ?
+                )
+            """)
+            params.extend(f"%{keyword}%" for keyword in keywords)
+            params.extend(filter_params)
+            params.append(candidates)
+        
+        if semantic_ids:
+            sources.append(f"""
+                SELECT id, ROW_NUMBER() OVER (ORDER BY position) AS rank, 'semantic' AS source
+                FROM (
+                    SELECT ar.id, CAST(j.key AS INTEGER) AS position
+                    FROM json_each(?) j
+                    JOIN ai_responses ar ON ar.id = j.value
+                    WHERE 1=1{filters}
+                    ORDER BY position
+                    LIMIT ?
+                )
+            """)
+            params.append(json.dumps([int(row_id) for row_id in semantic_ids]))
+            params.extend(filter_params)
+            params.append(candidates)
+        
+        if not sources:
+            return []
+        
+        query = f"""
+            WITH ranked AS ({' UNION ALL '.join(sources)}),
+            fused AS (
+                SELECT id,
+                       SUM(1.0 / (? + rank)) AS rrf_score,
+                       MAX(CASE WHEN source = 'lexical' THEN rank END) AS lexical_rank,
+                       MAX(CASE WHEN source = 'semantic' THEN rank END) AS semantic_rank
+                FROM ranked
+                GROUP BY id
+            )
+            SELECT 
+                ar.id, ar.claude_session_id, ar.sdk_session_id, ar.project, ar.prompt_number,
+                ar.response_text, ar.response_type, ar.tool_name, ar.tool_input, ar.tool_output,
+                ar.created_at, ar.created_at_epoch,
+                fused.rrf_score, fused.lexical_rank, fused.semantic_rank
+            FROM fused
+            JOIN ai_responses ar ON ar.id = fused.id
+            ORDER BY fused.rrf_score DESC, ar.created_at_epoch DESC, ar.id DESC
+            LIMIT ?
+        """
+        params.extend([rrf_k, limit])
+        
+        try:
+            cursor = self.conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"❌ 混合搜索失败: {e}")
+            return []
+
     def search_with_fts(
         self,
         keywords: List[str],
         logic: str = 'AND',
         project: str = None,
-        limit: int = 100
+        limit: int = 100,
+        cursor: str = None
     ) -> List[Dict[str, Any]]:
         """
         使用FTS5全文搜索（更高效的搜索方式）
+        
+        中文二元组索引存在时使用它（按子串匹配整段汉字，汉字旁的英文也能按词匹配）；
+        否则英文关键字使用 ai_responses_fts，含汉字的关键字回退到LIKE。
         """
         if not keywords:
             return []
         
-        # 构建FTS查询
-        if logic.upper() == 'AND':
-            fts_query = ' AND '.join([f'"{keyword}"' for keyword in keywords])
-        else:
-            fts_query = ' OR '.join([f'"{keyword}"' for keyword in keywords])
+        cjk_match = self._cjk_match('ai_responses', keywords, logic, 'ar.')
+        use_fts = cjk_match is None and not self._contains_cjk(keywords) and self.ensure_fts_index('ai_responses')
         
         query = """
             SELECT 
@@ -332,17 +1743,29 @@ class ClaudeMemDB:
                 ar.tool_name, ar.tool_input, ar.tool_output,
                 ar.created_at, ar.created_at_epoch
             FROM ai_responses ar
-            JOIN ai_responses_fts fts ON ar.id = fts.rowid
-            WHERE ai_responses_fts MATCH ?
         """
         
-        params = [fts_query]
+        if cjk_match:
+            query += f" WHERE {cjk_match[0]}"
+            params = list(cjk_match[1])
+        elif use_fts:
+            # 构建FTS查询
+            query += """
+            JOIN ai_responses_fts fts ON ar.id = fts.rowid
+            WHERE ai_responses_fts MATCH ?
+            """
+            params = [self._build_fts_query(keywords, logic)]
+        else:
+            operator = ' AND ' if logic.upper() == 'AND' else ' OR '
+            query += f" WHERE ({operator.join('ar.response_text LIKE ?' for _ in keywords)})"
+            params = [f"%{keyword}%" for keyword in keywords]
         
         if project:
             query += " AND ar.project = ?"
             params.append(project)
         
-        query += " ORDER BY ar.created_at_epoch DESC LIMIT ?"
+        query = self._apply_cursor(query, params, cursor, alias='ar.')
+        query += " ORDER BY ar.created_at_epoch DESC, ar.id DESC LIMIT ?"
         params.append(limit)
         
         try:
@@ -357,28 +1780,29 @@ class ClaudeMemDB:
                     'response_text': row['response_text'],
                     'response_type': row['response_type'],
                     'tool_name': row['tool_name'],
-                    'created_at': row['created_at']
+                    'created_at': row['created_at'],
+                    'created_at_epoch': row['created_at_epoch']
                 })
             return results
         except sqlite3.Error as e:
             print(f"❌ FTS搜索失败: {e}")
             return []
 
-    def get_tool_executions(
+    def _build_tool_executions_query(
         self,
         keywords: List[str] = None,
         project: str = None,
         tool_name: str = None,
         success_only: bool = False,
-        limit: int = 100
-    ) -> List[Dict[str, Any]]:
-        """获取工具执行记录"""
+        use_fts: bool = False
+    ) -> Tuple[str, List[Any]]:
+        """构建工具执行记录查询（不含排序和分页）"""
         query = """
             SELECT 
                 id, ai_response_id, claude_session_id, project, prompt_number,
                 tool_name, tool_input, tool_output, tool_duration_ms,
                 files_created, files_modified, files_read, files_deleted,
-                error_message, success, created_at
+                error_message, success, created_at, created_at_epoch
             FROM tool_executions
             WHERE 1=1
         """
@@ -396,14 +1820,41 @@ class ClaudeMemDB:
         if success_only:
             query += " AND success = 1"
         
-        if keywords:
+        if keywords and use_fts and self.ensure_fts_index('tool_executions'):
+            query += " AND id IN (SELECT rowid FROM tool_executions_fts WHERE tool_executions_fts MATCH ?)"
+            params.append(self._build_fts_query(keywords, 'OR'))
+        elif keywords:
+            prefilter = self._trigram_prefilter('tool_executions', keywords, 'OR')
+            if prefilter:
+                query += f" AND {prefilter[0]}"
+                params.extend(prefilter[1])
+            
             or_conditions = []
             for keyword in keywords:
                 or_conditions.append("(tool_input LIKE ? OR tool_output LIKE ? OR error_message LIKE ?)")
                 params.extend([f"%{keyword}%", f"%{keyword}%", f"%{keyword}%"])
             query += f" AND ({' OR '.join(or_conditions)})"
         
-        query += " ORDER BY created_at_epoch DESC LIMIT ?"
+        return query, params
+
+    def get_tool_executions(
+        self,
+        keywords: List[str] = None,
+        project: str = None,
+        tool_name: str = None,
+        success_only: bool = False,
+        limit: int = 100,
+        cursor: str = None,
+        use_fts: bool = False
+    ) -> List[Dict[str, Any]]:
+        """获取工具执行记录
+        
+        use_fts=True 时关键字通过 tool_executions_fts 索引匹配 tool_input、
+        tool_output 和 error_message（索引缺失时自动创建），否则使用 LIKE 子串匹配。
+        """
+        query, params = self._build_tool_executions_query(keywords, project, tool_name, success_only, use_fts)
+        query = self._apply_cursor(query, params, cursor)
+        query += " ORDER BY created_at_epoch DESC, id DESC LIMIT ?"
         params.append(limit)
         
         cursor = self.conn.execute(query, params)
@@ -412,47 +1863,566 @@ class ClaudeMemDB:
             results.append(dict(row))
         return results
 
-    def export_project_data(
-        self, 
-        project: str, 
-        format: str = 'json',
-        include_tool_executions: bool = True
-    ) -> str:
-        """导出项目数据"""
-        # 获取AI回复
-        responses = self.search_ai_responses(project=project, limit=10000)
+    def iter_tool_executions(
+        self,
+        keywords: List[str] = None,
+        project: str = None,
+        tool_name: str = None,
+        success_only: bool = False,
+        limit: int = None,
+        batch_size: int = None,
+        cursor: str = None,
+        use_fts: bool = False
+    ) -> Iterator[sqlite3.Row]:
+        """流式遍历工具执行记录（get_tool_executions的生成器版本）"""
+        query, params = self._build_tool_executions_query(keywords, project, tool_name, success_only, use_fts)
+        query = self._apply_cursor(query, params, cursor)
+        query += " ORDER BY created_at_epoch DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        yield from self._iter_rows(query, params, batch_size)
+
+    def get_tool_execution_stats(
+        self,
+        group_by: List[str] = ('tool_name',),
+        project: str = None,
+        tool_name: str = None,
+        since_epoch: int = None,
+        until_epoch: int = None,
+        percentiles: List[float] = (0.5, 0.95)
+    ) -> List[Dict[str, Any]]:
+        """
+        工具执行统计：按工具/项目/日期分组的调用次数、失败率、耗时分位数和文件数
+        
+        聚合和分位数都在SQL中完成（窗口函数按组排序耗时），只返回每组一行，
+        百万级执行记录也无需把原始行取到Python。
+        
+        Args:
+            group_by: 分组维度，可组合 'tool_name'、'project'、'day'（UTC日期）
+            project: 项目名称过滤
+            tool_name: 工具名过滤
+            since_epoch: 只统计 created_at_epoch >= since_epoch（毫秒）的记录
+            until_epoch: 只统计 created_at_epoch < until_epoch（毫秒）的记录
+            percentiles: 耗时分位数（0~1，最近秩法），结果列名如 p50_ms、p95_ms
+        
+        Returns:
+            每组一条记录，包含分组列以及：
+            executions, failures, failure_rate, avg_ms, max_ms, p50_ms..., files_read, files_touched
+            （files_touched 为创建、修改、删除的文件数之和）。按调用次数降序排列。
+        """
+        unknown = [g for g in group_by if g not in self.TOOL_STATS_DIMENSIONS]
+        if unknown or not group_by:
+            raise ValueError(f"不支持的分组维度: {unknown or group_by}")
+        
+        keys = list(group_by)
+        key_list = ', '.join(keys)
+        
+        where = "WHERE 1=1"
+        params = []
+        if project:
+            where += " AND project = ?"
+            params.append(project)
+        if tool_name:
+            where += " AND tool_name = ?"
+            params.append(tool_name)
+        if since_epoch is not None:
+            where += " AND created_at_epoch >= ?"
+            params.append(since_epoch)
+        if until_epoch is not None:
+            where += " AND created_at_epoch < ?"
+            params.append(until_epoch)
+        
+        def file_count(column):
+            # 大多数记录是空数组，先用字符串比较跳过JSON解析
+            return (f"CASE WHEN {column} IS NULL OR {column} = '[]' THEN 0 "
+                    f"WHEN json_valid({column}) THEN json_array_length({column}) ELSE 0 END")
+        
+        # 最近秩法：累计次数首次达到 ceil(p * n) 的耗时，用整数运算避免依赖数学函数
+        percentile_columns = []
+        for p in percentiles:
+            per_mille = int(round(p * 1000))
+            label = f"p{p * 100:g}_ms".replace('.', '_')
+            percentile_columns.append(
+                f"MIN(CASE WHEN d IS NOT NULL AND cum >= MAX(1, (n * {per_mille} + 999) / 1000) THEN d END) AS {label}"
+            )
+        
+        # 先按 (分组, 耗时) 聚合成直方图，只扫描一次原表；分位数再由直方图上的
+        # 累计窗口求出，排序的行数是不同耗时值的个数而不是执行记录数
+        query = f"""
+            WITH hist AS (
+                SELECT {', '.join(f"{self.TOOL_STATS_DIMENSIONS[g][0]} AS {g}" for g in keys)},
+                       tool_duration_ms AS d,
+                       COUNT(*) AS c,
+                       SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END) AS f,
+                       SUM({file_count('files_read')}) AS r,
+                       SUM({file_count('files_created')} + {file_count('files_modified')} + {file_count('files_deleted')}) AS w
+                FROM tool_executions
+                {where}
+                GROUP BY {key_list}, tool_duration_ms
+            ),
+            cum AS (
+                SELECT *,
+                       SUM(CASE WHEN d IS NOT NULL THEN c ELSE 0 END)
+                           OVER (PARTITION BY {key_list} ORDER BY d ROWS UNBOUNDED PRECEDING) AS cum,
+                       SUM(CASE WHEN d IS NOT NULL THEN c ELSE 0 END) OVER (PARTITION BY {key_list}) AS n
+                FROM hist
+            )
+            SELECT {', '.join(f"{self.TOOL_STATS_DIMENSIONS[g][1]} AS {g}" for g in keys)},
+                   SUM(c) AS executions,
+                   SUM(f) AS failures,
+                   1.0 * SUM(f) / SUM(c) AS failure_rate,
+                   1.0 * SUM(d * c) / NULLIF(MAX(n), 0) AS avg_ms,
+                   MAX(d) AS max_ms,
+                   {', '.join(percentile_columns)},
+                   SUM(r) AS files_read,
+                   SUM(w) AS files_touched
+            FROM cum
+            GROUP BY {key_list}
+            ORDER BY executions DESC, {key_list}
+        """
+        
+        try:
+            cursor = self.conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"❌ 工具统计查询失败: {e}")
+            return []
+
+    def _build_record_query(self, table: str, project: str = None) -> Tuple[str, List[Any], str]:
+        """CHANGE_FEED_TABLES 中某张表的完整记录查询，返回 (查询, 参数, 表别名)"""
+        builders = {
+            'ai_responses': self._build_ai_responses_query,
+            'user_prompts': self._build_user_prompts_query,
+            'tool_executions': self._build_tool_executions_query,
+        }
+        if table not in builders:
+            raise ValueError(f"不支持的表: {table}")
+        query, params = builders[table](project=project)
+        return query, params, self.CHANGE_FEED_TABLES[table]
+
+    def get_records_by_ids(self, table: str, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """按id批量读取完整记录，返回 {id: 记录}；不存在的id不出现在结果中"""
+        if not ids:
+            return {}
+        
+        query, params, alias = self._build_record_query(table)
+        query += f" AND {alias}id IN ({', '.join('?' * len(ids))})"
+        params.extend(int(row_id) for row_id in ids)
+        
+        try:
+            cursor = self.conn.execute(query, params)
+            return {row['id']: dict(row) for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            print(f"❌ 按id查询 {table} 失败: {e}")
+            return {}
+
+    def change_checkpoint(self, tables: List[str] = None) -> Dict[str, int]:
+        """返回各表当前的最大id，作为"从现在开始"同步的检查点"""
+        checkpoint = {}
+        for table in tables or self.CHANGE_FEED_TABLES:
+            if self._table_columns(table):
+                row = self.conn.execute(f"SELECT COALESCE(MAX(id), 0) AS max_id FROM {table}").fetchone()
+                checkpoint[table] = row['max_id']
+        return checkpoint
+
+    def changes_since(
+        self,
+        checkpoint: Dict[str, int] = None,
+        tables: List[str] = None,
+        project: str = None,
+        batch_size: int = None
+    ) -> Iterator[Tuple[str, sqlite3.Row]]:
+        """
+        流式输出检查点之后新增的记录，生成 (表名, 行)
+
+        每张表按 id 升序读取 id 大于检查点的记录，直接在主键上定位起点，
+        开销只与新增记录数成正比。checkpoint 为 {表名: 已同步的最大id}，
+        缺少的表从头同步；它会随每一行原地推进，因此处理完任意一行后
+        用 save_checkpoint() 保存，下次从断点继续而不会遗漏或重复：
+
+            checkpoint = load_checkpoint('sync.checkpoint.json')
+            for table, row in db.changes_since(checkpoint):
+                replicate(table, row)
+            save_checkpoint('sync.checkpoint.json', checkpoint)
+
+        只能发现新增记录，修改或删除历史记录不会出现在结果中。
+
+        Args:
+            checkpoint: 检查点字典，None 表示从头同步
+            tables: 要同步的表，默认 CHANGE_FEED_TABLES 中的全部表
+            project: 只同步指定项目的记录
+            batch_size: 每批从游标读取的行数
+        """
+        if checkpoint is None:
+            checkpoint = {}
+        
+        for table in tables or self.CHANGE_FEED_TABLES:
+            if not self._table_columns(table):
+                continue
+            
+            query, params, alias = self._build_record_query(table, project)
+            query += f" AND {alias}id > ? ORDER BY {alias}id"
+            params.append(checkpoint.get(table, 0))
+            
+            try:
+                for row in self._iter_rows(query, params, batch_size):
+                    checkpoint[table] = row['id']
+                    yield table, row
+            except sqlite3.Error as e:
+                print(f"❌ 增量查询 {table} 失败: {e}")
+
+    def _data_version(self) -> int:
+        """PRAGMA data_version：其他连接每提交一次写入就会变化，读取它不访问任何表"""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def follow(
+        self,
+        checkpoint: Dict[str, int] = None,
+        tables: List[str] = None,
+        project: str = None,
+        interval: float = 1.0,
+        batch_size: int = None,
+        stop: threading.Event = None
+    ) -> Iterator[Tuple[str, sqlite3.Row]]:
+        """
+        持续跟踪新增记录（类似 tail -f），生成 (表名, 行)
+
+        每隔 interval 秒检查一次 PRAGMA data_version，只有数据库确实被
+        其他连接（如 worker）修改过才执行 changes_since()，空闲时不查询任何表。
+        data_version 不反映本连接自己的写入，写入方应使用另一个连接。
+
+        Args:
+            checkpoint: 同 changes_since()，原地推进；None 表示只跟踪此后的新增记录
+            tables: 要同步的表
+            project: 只同步指定项目的记录
+            interval: 轮询间隔（秒）
+            batch_size: 每批从游标读取的行数
+            stop: 设置后在下一次轮询时结束；不传时由调用方停止迭代
+        """
+        if checkpoint is None:
+            checkpoint = self.change_checkpoint(tables)
+        
+        last_version = None
+        while stop is None or not stop.is_set():
+            # 先读版本再查询：查询期间提交的写入会让下一轮再查一次
+            version = self._data_version()
+            if version != last_version:
+                last_version = version
+                yield from self.changes_since(checkpoint, tables, project, batch_size)
+            
+            if stop is not None:
+                stop.wait(interval)
+            else:
+                time.sleep(interval)
+
+    def _open_export_output(self, output, compression: str):
+        """打开导出目标：路径按 compression 打开，文件对象原样使用"""
+        if isinstance(output, (str, Path)):
+            path = str(Path(output).expanduser())
+            if compression == 'auto':
+                compression = 'gzip' if path.endswith('.gz') else 'zstd' if path.endswith('.zst') else None
+            if compression == 'gzip':
+                return gzip.open(path, 'wt', encoding='utf-8')
+            if compression == 'zstd':
+                try:
+                    import zstandard
+                except ImportError:
+                    raise ImportError("zstd压缩需要安装 zstandard: pip install zstandard") from None
+                return zstandard.open(path, 'wt', encoding='utf-8')
+            return open(path, 'w', encoding='utf-8')
+        
+        if compression in ('gzip', 'zstd'):
+            # 文件对象需以二进制模式打开，由这里包装为压缩文本流
+            if compression == 'gzip':
+                stream = gzip.GzipFile(fileobj=output, mode='wb')
+            else:
+                import zstandard
+                stream = zstandard.ZstdCompressor().stream_writer(output, closefd=False)
+            return io.TextIOWrapper(stream, encoding='utf-8')
+        return nullcontext(output)
+
+    def _export_rows(
+        self,
+        section: str,
+        rows: Iterator[sqlite3.Row],
+        progress=None,
+        progress_every: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """逐行产出字典并按 progress_every 回调 progress(section, 已导出行数)"""
+        count = 0
+        for row in rows:
+            yield dict(row)
+            count += 1
+            if progress and count % progress_every == 0:
+                progress(section, count)
+        if progress and count % progress_every:
+            progress(section, count)
+
+    def export_project(
+        self,
+        project: str,
+        output,
+        format: str = 'jsonl',
+        include_tool_executions: bool = True,
+        compression: str = 'auto',
+        progress=None,
+        progress_every: int = 1000
+    ) -> Dict[str, int]:
+        """
+        流式导出项目数据到文件
+        
+        记录从游标分批读取后立即写出，不限制行数，内存占用与项目大小无关。
+        
+        Args:
+            project: 项目名称
+            output: 文件路径或已打开的文件对象（文本模式；压缩时为二进制模式）
+            format: 'jsonl'（每行一条记录，首行为导出信息）、'json' 或 'markdown'
+            include_tool_executions: 是否导出工具执行记录（markdown格式只含AI回复）
+            compression: 'auto'（按 .gz / .zst 后缀判断）、None、'gzip' 或 'zstd'
+            progress: 进度回调 progress(section, count)，section 为 'ai_responses' 或 'tool_executions'
+            progress_every: 每导出多少行回调一次
+        
+        Returns:
+            各部分导出的记录数，如 {'ai_responses': 12000, 'tool_executions': 8000}
+        """
+        format = format.lower()
+        if format not in ('jsonl', 'json', 'markdown'):
+            raise ValueError(f"不支持的导出格式: {format}")
         
-        data = {
+        header = {
             'project': project,
             'exported_at': datetime.now().isoformat(),
-            'stats': self.get_project_stats(project),
-            'ai_responses': responses
+            'stats': self.get_project_stats(project)
         }
+        counts = {'ai_responses': 0}
+        if include_tool_executions and format != 'markdown':
+            counts['tool_executions'] = 0
         
-        if include_tool_executions:
-            # 获取工具执行记录
-            executions = self.get_tool_executions(project=project, limit=10000)
-            data['tool_executions'] = executions
+        def sections():
+            for section in counts:
+                iterate = self.iter_ai_responses if section == 'ai_responses' else self.iter_tool_executions
+                yield section, self._export_rows(section, iterate(project=project), progress, progress_every)
         
-        if format.lower() == 'json':
-            return json.dumps(data, indent=2, ensure_ascii=False)
-        else:
-            # 简单的Markdown格式
-            markdown = f"# {project} 项目数据导出\n\n"
-            markdown += f"导出时间: {data['exported_at']}\n\n"
-            markdown += f"## 统计信息\n"
-            markdown += f"- AI回复数: {data['stats']['ai_response_count']}\n"
-            markdown += f"- 会话数: {data['stats']['session_count']}\n\n"
+        with self._open_export_output(output, compression) as f:
+            if format == 'jsonl':
+                f.write(json.dumps(dict(header, record='export'), ensure_ascii=False) + '\n')
+                for section, rows in sections():
+                    record = section[:-1]
+                    for row in rows:
+                        f.write(json.dumps(dict(row, record=record), ensure_ascii=False) + '\n')
+                        counts[section] += 1
+            
+            elif format == 'json':
+                # 与 json.dumps(data, indent=2) 的输出逐字节一致，但逐条写出
+                f.write('{\n')
+                for key, value in header.items():
+                    body = json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+                    f.write(f'  {json.dumps(key)}: {body},\n')
+                for i, (section, rows) in enumerate(sections()):
+                    if i:
+                        f.write(',\n')
+                    f.write(f'  {json.dumps(section)}: [')
+                    for row in rows:
+                        body = json.dumps(row, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+                        f.write(('\n    ' if not counts[section] else ',\n    ') + body)
+                        counts[section] += 1
+                    f.write('\n  ]' if counts[section] else ']')
+                f.write('\n}')
+            
+            else:
+                stats = header['stats']
+                f.write(f"# {project} 项目数据导出\n\n")
+                f.write(f"导出时间: {header['exported_at']}\n\n")
+                f.write(f"## 统计信息\n")
+                f.write(f"- AI回复数: {stats['ai_response_count']}\n")
+                f.write(f"- 会话数: {stats['session_count']}\n\n")
+                f.write(f"## AI回复记录\n\n")
+                for section, rows in sections():
+                    for i, response in enumerate(rows, 1):
+                        f.write(f"### {i}. {response['response_type']} (会话: {response['claude_session_id']})\n")
+                        f.write(f"**时间**: {response['created_at']}\n\n")
+                        f.write(f"**内容**:\n```\n{response['response_text']}\n```\n\n")
+                        if response['tool_name']:
+                            f.write(f"**工具**: {response['tool_name']}\n\n")
+                        counts[section] += 1
+        
+        return counts
+
+    def _columnar_batch(
+        self,
+        columns: List[Tuple[str, str]],
+        rows: List[sqlite3.Row],
+        dictionaries: Dict[str, Tuple[Any, Dict[str, int]]]
+    ) -> 'pa.RecordBatch':
+        """把一批行转换为 RecordBatch；字典列使用整个导出共用的固定字典"""
+        arrays = []
+        for name, kind in columns:
+            values = [row[name] for row in rows]
+            if kind == 'dict':
+                dictionary, positions = dictionaries[name]
+                indices = pa.array([None if v is None else positions[v] for v in values], type=pa.int32())
+                arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+            elif kind == 'bool':
+                arrays.append(pa.array([None if v is None else bool(v) for v in values], type=pa.bool_()))
+            else:
+                arrays.append(pa.array(values, type=getattr(pa, kind)()))
+        return pa.RecordBatch.from_arrays(arrays, names=[name for name, _ in columns])
+
+    def export_columnar(
+        self,
+        output_dir: str,
+        tables: List[str] = ('ai_responses', 'tool_executions'),
+        format: str = 'parquet',
+        project: str = None,
+        partition: bool = True,
+        batch_size: int = 50_000,
+        compression: str = 'zstd',
+        progress=None
+    ) -> Dict[str, int]:
+        """
+        以列式格式（Parquet 或 Arrow IPC）导出AI回复和工具执行记录
+        
+        记录按批次转换为 RecordBatch 写出，内存占用只与 batch_size 有关。
+        project、tool_name、response_type 为字典编码列，字典在整个导出中固定，
+        因此 Arrow IPC 文件也可以包含多个批次。
+        
+        partition=True 时按项目和月份分区（Hive 目录结构，项目名经URL编码）：
+        
+            <output_dir>/ai_responses/project=<项目>/month=2025-01/part-0.parquet
+        
+        分区列不写入文件，读取时由目录恢复为字典列：
+        pyarrow.parquet.read_table(f"{output_dir}/ai_responses") 或
+        pyarrow.dataset.dataset(..., format='ipc', partitioning='hive')。
+        partition=False 时每个表写一个文件 <output_dir>/<表名>.parquet。
+        
+        Args:
+            output_dir: 输出目录，已有同名文件会被覆盖
+            tables: 要导出的表，见 COLUMNAR_SCHEMAS
+            format: 'parquet' 或 'arrow'（Arrow IPC 文件，即 Feather v2）
+            project: 只导出该项目
+            partition: 是否按项目和月份分区
+            batch_size: 每个 RecordBatch 的行数
+            compression: 压缩算法（'zstd'、'lz4'、'snappy' 等，None 不压缩）
+            progress: 进度回调 progress(table, 已导出行数)，每写出一批调用一次
+        
+        Returns:
+            各表导出的行数
+        """
+        if pa is None:
+            raise ImportError("列式导出需要 pyarrow: pip install pyarrow")
+        if format not in ('parquet', 'arrow'):
+            raise ValueError(f"不支持的列式格式: {format}")
+        
+        import os
+        extension = 'parquet' if format == 'parquet' else 'arrow'
+        counts = {}
+        
+        for table in tables:
+            columns = self.COLUMNAR_SCHEMAS[table]
+            file_columns = [c for c in columns if not (partition and c[0] == 'project')]
+            
+            # 字典列的取值在导出开始时一次确定
+            dictionaries = {}
+            for name, kind in columns:
+                if kind == 'dict':
+                    values = [row[0] for row in self.conn.execute(
+                        f"SELECT DISTINCT {name} FROM {table} WHERE {name} IS NOT NULL ORDER BY {name}"
+                    )]
+                    dictionaries[name] = (pa.array(values, type=pa.string()), {v: i for i, v in enumerate(values)})
             
-            markdown += f"## AI回复记录\n\n"
-            for i, response in enumerate(responses, 1):
-                markdown += f"### {i}. {response['response_type']} (会话: {response['claude_session_id']})\n"
-                markdown += f"**时间**: {response['created_at']}\n\n"
-                markdown += f"**内容**:\n```\n{response['response_text']}\n```\n\n"
-                if response['tool_name']:
-                    markdown += f"**工具**: {response['tool_name']}\n\n"
+            schema = pa.schema([
+                (name, pa.dictionary(pa.int32(), pa.string()) if kind == 'dict'
+                 else pa.bool_() if kind == 'bool' else getattr(pa, kind)())
+                for name, kind in file_columns
+            ])
             
-            return markdown
+            if table == 'ai_responses':
+                query, params = self._build_ai_responses_query(project=project)
+            else:
+                query, params = self._build_tool_executions_query(project=project)
+            # 按分区键排序，每个分区的记录连续到达，同一时刻只需打开一个文件
+            query += " ORDER BY project, created_at_epoch, id"
+            
+            writer = None
+            current_key = None
+            batch = []
+            months = {}
+            counts[table] = 0
+            
+            def open_writer(key):
+                if partition:
+                    project_dir = quote(key[0], safe='') if key[0] is not None else '__HIVE_DEFAULT_PARTITION__'
+                    directory = os.path.join(output_dir, table, f"project={project_dir}", f"month={key[1]}")
+                    path = os.path.join(directory, f"part-0.{extension}")
+                else:
+                    directory = output_dir
+                    path = os.path.join(output_dir, f"{table}.{extension}")
+                os.makedirs(directory, exist_ok=True)
+                if format == 'parquet':
+                    return pq.ParquetWriter(path, schema, compression=compression or 'none')
+                options = pa.ipc.IpcWriteOptions(compression=compression) if compression else None
+                return pa.ipc.new_file(path, schema, options=options)
+            
+            def flush():
+                writer.write_batch(self._columnar_batch(file_columns, batch, dictionaries))
+                counts[table] += len(batch)
+                batch.clear()
+                if progress:
+                    progress(table, counts[table])
+            
+            try:
+                for row in self._iter_rows(query, params, batch_size=min(batch_size, 10_000)):
+                    key = None
+                    if partition:
+                        epoch = row['created_at_epoch'] or 0
+                        day = epoch // 86_400_000
+                        if day not in months:
+                            months[day] = datetime.fromtimestamp(day * 86_400, timezone.utc).strftime('%Y-%m')
+                        key = (row['project'], months[day])
+                    
+                    if writer is None or key != current_key:
+                        if batch:
+                            flush()
+                        if writer is not None:
+                            writer.close()
+                        writer = open_writer(key)
+                        current_key = key
+                    
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        flush()
+                
+                if batch:
+                    flush()
+                if writer is None and not partition:
+                    # 空表也写出只含表结构的文件
+                    writer = open_writer(None)
+            finally:
+                if writer is not None:
+                    writer.close()
+            
+            print(f"📦 {table}: 导出 {counts[table]} 行到 {os.path.join(output_dir, table if partition else '')}")
+        
+        return counts
+
+    def export_project_data(
+        self, 
+        project: str, 
+        format: str = 'json',
+        include_tool_executions: bool = True
+    ) -> str:
+        """导出项目数据为字符串（大项目请使用 export_project 直接写文件）"""
+        buffer = io.StringIO()
+        self.export_project(
+            project,
+            buffer,
+            format='json' if format.lower() == 'json' else 'markdown',
+            include_tool_executions=include_tool_executions,
+            compression=None
+        )
+        return buffer.getvalue()
 
 
 def main():
@@ -537,13 +2507,9 @@ def main():
         
         # 7. 数据导出示例
         print(f"\n📤 导出项目 '{sample_project}' 数据:")
-        export_data = db.export_project_data(sample_project, format='json')
-        print(f"  导出数据长度: {len(export_data)} 字符")
-        
-        # 保存到文件
         export_file = f"/tmp/{sample_project}_export.json"
-        with open(export_file, 'w', encoding='utf-8') as f:
-            f.write(export_data)
+        counts = db.export_project(sample_project, export_file, format='json')
+        print(f"  导出记录数: {counts}")
         print(f"  数据已保存到: {export_file}")
         
     except Exception as e:
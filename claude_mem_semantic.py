@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+"""
+Claude-Mem 本地语义索引
+不依赖 Chroma 等外部服务，在进程内为用户对话和AI回复建立向量索引，
+适合离线/隔离网络环境下按语义召回历史对话
+"""
+
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 语义索引为可选功能
+    np = None
+
+from claude_mem_db_tool import ClaudeMemDB, CJK_CHARS
+
+
+# 拉丁字母/数字词，以及连续的中日韩字符
+WORD_PATTERN = re.compile(f'[a-z0-9_]+|[{CJK_CHARS}]+')
+
+
+def text_features(text: str, max_chars: int = 20_000) -> Dict[str, float]:
+    """
+    把文本转换为 {特征: 权重}
+
+    - 英文词本身，以及长词的字符三元组（connect / connection 共享大部分特征）
+    - 中文等没有空格分词的文字使用单字和相邻二字组合
+    """
+    features: Dict[str, float] = {}
+    for word in WORD_PATTERN.findall(text[:max_chars].lower()):
+        if word[0].isascii():
+            if len(word) > 1:
+                features[word] = features.get(word, 0.0) + 1.0
+            if len(word) >= 5:
+                padded = f'<{word}>'
+                for i in range(len(padded) - 2):
+                    gram = '#' + padded[i:i + 3]
+                    features[gram] = features.get(gram, 0.0) + 0.25
+        else:
+            for i, char in enumerate(word):
+                features[char] = features.get(char, 0.0) + 0.5
+                if i + 1 < len(word):
+                    pair = word[i:i + 2]
+                    features[pair] = features.get(pair, 0.0) + 1.0
+    return features
+
+
+def train_centroids(
+    vectors: Any,
+    nlist: int,
+    iterations: int = 8,
+    sample_size: int = None,
+    seed: int = 0,
+    rows: Any = None
+) -> Any:
+    """
+    球面 k-means：在向量样本上训练 nlist 个单位长度的聚类中心
+
+    样本默认取 nlist 的32倍（至少1万条），训练开销与总记录数无关。
+    rows 指定可参与抽样的行号（例如未删除的记录），只读取抽中的行。
+    """
+    rng = np.random.default_rng(seed)
+    if rows is None:
+        rows = np.arange(len(vectors))
+    sample_size = min(len(rows), sample_size or max(nlist * 32, 10_000))
+    sample = np.asarray(vectors[np.sort(rng.choice(rows, sample_size, replace=False))])
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = assign_clusters(centroids, sample)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        # 空簇重新取一个随机样本作为中心
+        empty = np.flatnonzero(np.bincount(labels, minlength=nlist) == 0)
+        sums[empty] = sample[rng.choice(len(sample), len(empty))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+def assign_clusters(centroids: Any, vectors: Any, batch_size: int = 65_536) -> Any:
+    """返回每个向量内积最大的聚类中心编号 (int32)"""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        batch = np.asarray(vectors[start:start + batch_size])
+        labels[start:start + batch_size] = np.argmax(batch @ centroids.T, axis=1)
+    return labels
+
+
+class IVFLists:
+    """
+    IVF-flat 倒排表：按聚类中心分组的记录行号
+
+    查询时只对离查询最近的 nprobe 个簇内的记录计算精确相似度，
+    开销约为全量扫描的 nprobe / nlist。
+    """
+
+    def __init__(self, centroids: Any, assignments: Any):
+        self.centroids = centroids
+        self.nlist = len(centroids)
+        self.order = np.argsort(assignments, kind='stable')
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=self.nlist))))
+
+    def probe(self, query: Any, nprobe: int) -> Any:
+        """返回最近的 nprobe 个簇内的全部行号（升序，便于顺序读取内存映射文件）"""
+        nprobe = min(nprobe, self.nlist)
+        clusters = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in clusters])
+        rows.sort()
+        return rows
+
+
+class SemanticIndex:
+    """
+    基于特征哈希的本地语义索引
+
+    每条记录的文本经 text_features() 提取特征后哈希到 dim 维，
+    按次线性词频加权并做L2归一化，保存为与数据库同目录的内存映射矩阵。
+    查询时对查询向量乘以IDF（由索引维护的文档频率计算）后与全部向量
+    求余弦相似度取 top-k。IDF只作用在查询侧，因此新增记录改变文档频率
+    后已有向量无需重算，update() 只需追加新记录。
+
+    索引目录（默认 <数据库名>.semantic/）包含：
+        meta.json     维度、记录数、各表同步检查点、项目名列表
+        vectors.f32   (记录数, dim) float32 向量矩阵
+        ids.i64       记录id
+        tables.u8     记录所属表（SOURCE_TABLES 中的下标）
+        projects.i32  项目编号（meta.json 中项目列表的下标，-1 表示未知）
+        deleted.u8    删除标记，delete() 原地置1
+        df.f32        每个维度的文档频率
+        centroids.f32 / lists.i32
+                      近似最近邻（IVF-flat）的聚类中心和每条记录所属的簇
+
+    记录数达到 ann_min_rows 后自动训练 IVF-flat 索引，search() 只扫描离查询
+    最近的 nprobe 个簇；之后新增的记录在写入时直接分配到最近的簇，
+    记录数翻倍时重新训练。
+
+    需要 numpy（pip install numpy）。
+    """
+
+    SOURCE_TABLES = ('ai_responses', 'user_prompts')
+    TEXT_COLUMNS = {'ai_responses': 'response_text', 'user_prompts': 'prompt_text'}
+    DEFAULT_DIM = 256
+    INDEX_VERSION = 1
+    # 记录数达到该值后建立近似最近邻索引，之前全量扫描已足够快
+    ANN_MIN_ROWS = 100_000
+
+    def __init__(
+        self,
+        db_path: str = None,
+        index_dir: str = None,
+        dim: int = DEFAULT_DIM,
+        pool_size: int = 4,
+        refresh_interval: float = 30.0,
+        ann_min_rows: int = ANN_MIN_ROWS,
+        nprobe: int = None
+    ):
+        """
+        Args:
+            db_path: 数据库路径，默认 ~/.claude-mem/claude-mem.db
+            index_dir: 索引目录，默认与数据库同目录的 <数据库名>.semantic/
+            dim: 向量维度，只在新建索引时使用
+            pool_size: 只读连接池大小，供多线程查询时读取记录
+            refresh_interval: search() 自动增量更新的最小间隔（秒），0 表示不自动更新
+            ann_min_rows: 记录数达到该值后使用近似最近邻搜索
+            nprobe: 近似搜索扫描的簇数，默认为簇数的 1/16（至少8）；越大召回率越高、越慢
+        """
+        if np is None:
+            raise ImportError("语义索引需要 numpy: pip install numpy")
+
+        self.db = ClaudeMemDB(db_path, read_only=True, pool_size=pool_size)
+        db_file = Path(self.db.db_path).expanduser()
+        self.index_dir = Path(index_dir) if index_dir else db_file.with_name(db_file.stem + '.semantic')
+        self.dim = dim
+        self.refresh_interval = refresh_interval
+        self.ann_min_rows = ann_min_rows
+        self.nprobe = nprobe
+        self._last_refresh = 0.0
+        self._update_lock = threading.Lock()
+        self._load()
+
+    def close(self):
+        """关闭数据库连接"""
+        self.db.close()
+
+    def __len__(self) -> int:
+        return self._snapshot['count']
+
+    def _path(self, name: str) -> Path:
+        return self.index_dir / name
+
+    def _load(self):
+        """读取磁盘上的索引；meta.json 之后追加的残留数据（更新中途退出）会被截断"""
+        meta_path = self._path('meta.json')
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+            if meta.get('version') != self.INDEX_VERSION:
+                raise ValueError(f"不支持的语义索引版本: {meta.get('version')}，请删除 {self.index_dir} 后重建")
+            self.dim = meta['dim']
+        else:
+            meta = {'version': self.INDEX_VERSION, 'dim': self.dim, 'count': 0, 'checkpoint': {}, 'projects': []}
+
+        self.meta = meta
+        count = meta['count']
+        arrays = {}
+        for name, dtype, width in self._array_files():
+            path = self._path(name)
+            expected = count * width * np.dtype(dtype).itemsize
+            if name == 'deleted.u8' and count and not path.exists():
+                np.zeros(count, dtype=dtype).tofile(path)
+            if path.exists() and path.stat().st_size > expected:
+                with open(path, 'r+b') as f:
+                    f.truncate(expected)
+            if count:
+                shape = (count, width) if width > 1 else (count,)
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape)
+            else:
+                arrays[name] = np.zeros((0, width) if width > 1 else (0,), dtype=dtype)
+
+        df_path = self._path('df.f32')
+        df = np.fromfile(df_path, dtype=np.float32) if df_path.exists() else np.zeros(self.dim, dtype=np.float32)
+        ivf = None
+        if meta.get('ann') and count:
+            centroids = np.fromfile(self._path('centroids.f32'), dtype=np.float32).reshape(-1, self.dim)
+            ivf = IVFLists(centroids, arrays['lists.i32'])
+        self._snapshot = {'count': count, 'arrays': arrays, 'df': df, 'ivf': ivf}
+
+    def _array_files(self) -> List[Tuple[str, Any, int]]:
+        """按记录追加的文件：(文件名, dtype, 每条记录的元素数)"""
+        return [
+            ('vectors.f32', np.float32, self.dim),
+            ('ids.i64', np.int64, 1),
+            ('tables.u8', np.uint8, 1),
+            ('projects.i32', np.int32, 1),
+            ('deleted.u8', np.uint8, 1),
+        ] + ([('lists.i32', np.int32, 1)] if self.meta.get('ann') else [])
+
+    def _write_meta(self):
+        tmp_path = self._path('meta.json.tmp')
+        tmp_path.write_text(json.dumps(self.meta, ensure_ascii=False), encoding='utf-8')
+        tmp_path.replace(self._path('meta.json'))
+
+    def _hash_features(self, features: Dict[str, float]) -> Dict[int, float]:
+        """特征哈希：稳定的 crc32 决定维度，另一位决定符号以抵消碰撞"""
+        buckets: Dict[int, float] = {}
+        for feature, weight in features.items():
+            h = zlib.crc32(feature.encode('utf-8'))
+            bucket = h % self.dim
+            value = 1.0 + math.log(weight) if weight >= 1.0 else weight
+            buckets[bucket] = buckets.get(bucket, 0.0) + (value if h & 0x80000000 else -value)
+        return buckets
+
+    def _document_vector(self, text: str) -> Tuple[Any, List[int]]:
+        """返回 (归一化向量, 非零维度列表)"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        buckets = self._hash_features(text_features(text or ''))
+        for bucket, value in buckets.items():
+            vector[bucket] = value
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector, [bucket for bucket, value in buckets.items() if value != 0.0]
+
+    def update(self, batch_size: int = 2000) -> int:
+        """
+        把上次更新之后新增的记录加入索引，返回新增条数
+
+        通过 ClaudeMemDB.changes_since() 按id读取新记录，开销与新增记录数成正比；
+        没有新记录时只有两次主键查找。记录的修改和删除不会反映到索引中。
+        """
+        with self._update_lock:
+            return self._update(batch_size)
+
+    def _update(self, batch_size: int) -> int:
+        try:
+            return self._append_new_records(batch_size)
+        except Exception:
+            # 写入中途失败时各数据文件的长度可能不一致，也可能已经修改了内存中的 meta；
+            # 重新读取 meta.json 并截断多出的数据，下次更新才能从对齐的位置继续追加
+            self._load()
+            raise
+
+    def _append_new_records(self, batch_size: int) -> int:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        meta = self.meta
+        checkpoint = dict(meta['checkpoint'])
+        project_codes = {name: code for code, name in enumerate(meta['projects'])}
+        df = self._snapshot['df'].copy()
+        ivf = self._snapshot['ivf']
+        added = 0
+
+        with self.db.reader() as r:
+            latest = r.change_checkpoint(self.SOURCE_TABLES)
+            if all(checkpoint.get(table, 0) >= max_id for table, max_id in latest.items()):
+                return 0
+
+            # 用户对话本身没有项目字段，通过会话关联
+            session_projects = {
+                row['claude_session_id']: row['project']
+                for row in r.conn.execute("SELECT claude_session_id, project FROM sdk_sessions")
+            } if r._table_columns('sdk_sessions') else {}
+
+            batch = []
+            files = {name: open(self._path(name), 'ab') for name, _, _ in self._array_files()}
+            try:
+                def flush():
+                    nonlocal added
+                    if not batch:
+                        return
+                    vectors = np.stack([item[0] for item in batch])
+                    files['vectors.f32'].write(vectors.tobytes())
+                    files['ids.i64'].write(np.array([item[1] for item in batch], dtype=np.int64).tobytes())
+                    files['tables.u8'].write(np.array([item[2] for item in batch], dtype=np.uint8).tobytes())
+                    files['projects.i32'].write(np.array([item[3] for item in batch], dtype=np.int32).tobytes())
+                    files['deleted.u8'].write(bytes(len(batch)))
+                    if ivf is not None:
+                        files['lists.i32'].write(assign_clusters(ivf.centroids, vectors).tobytes())
+                    added += len(batch)
+                    batch.clear()
+
+                for table, row in r.changes_since(checkpoint, tables=self.SOURCE_TABLES):
+                    if table == 'user_prompts':
+                        project = session_projects.get(row['claude_session_id'])
+                    else:
+                        project = row['project']
+                    if project is None:
+                        code = -1
+                    elif project in project_codes:
+                        code = project_codes[project]
+                    else:
+                        code = project_codes[project] = len(meta['projects'])
+                        meta['projects'].append(project)
+
+                    vector, nonzero = self._document_vector(row[self.TEXT_COLUMNS[table]])
+                    df[nonzero] += 1
+                    batch.append((vector, row['id'], self.SOURCE_TABLES.index(table), code))
+                    if len(batch) >= batch_size:
+                        flush()
+                flush()
+            finally:
+                for f in files.values():
+                    f.close()
+
+        if not added and checkpoint == meta['checkpoint']:
+            return 0
+
+        # 数据文件写完后再写 df 和 meta.json，meta.json 中的记录数才是有效的记录数
+        df.tofile(self._path('df.f32'))
+        meta['count'] += added
+        meta['checkpoint'] = checkpoint
+        self._write_meta()
+        self._load()
+        if self._ann_due():
+            self._build_ann()
+        return added
+
+    def _ann_due(self) -> bool:
+        """记录数达到 ann_min_rows 且尚未训练，或自上次训练后翻倍"""
+        count = self.meta['count']
+        ann = self.meta.get('ann')
+        return count >= self.ann_min_rows and (not ann or count >= 2 * ann['trained_count'])
+
+    def build_ann(self, nlist: int = None):
+        """
+        （重新）训练近似最近邻索引并把全部记录分配到簇
+
+        Args:
+            nlist: 簇数，默认约为 sqrt(记录数)
+        """
+        with self._update_lock:
+            self._build_ann(nlist)
+
+    def _build_ann(self, nlist: int = None):
+        arrays = self._snapshot['arrays']
+        vectors = arrays['vectors.f32']
+        alive = np.flatnonzero(arrays['deleted.u8'] == 0)
+        if not len(alive):
+            return
+        nlist = min(nlist or max(16, int(math.sqrt(len(alive)))), len(alive))
+
+        start = time.perf_counter()
+        centroids = train_centroids(vectors, nlist, rows=alive)
+        assignments = assign_clusters(centroids, vectors)
+
+        for name, array in (('centroids.f32', centroids), ('lists.i32', assignments)):
+            tmp_path = self._path(name + '.tmp')
+            array.tofile(tmp_path)
+            tmp_path.replace(self._path(name))
+        self.meta['ann'] = {'nlist': nlist, 'trained_count': self.meta['count']}
+        self._write_meta()
+        self._load()
+        print(f"🔧 已建立近似最近邻索引: {nlist} 个簇, {self.meta['count']} 条记录 ({time.perf_counter() - start:.1f}s)")
+
+    def delete(self, table: str, ids: List[int]) -> int:
+        """
+        从索引中删除指定表的记录（与 ai_responses.id / user_prompts.id 对应），返回删除条数
+
+        删除只在 deleted.u8 中做标记，搜索时跳过；向量文件保持只追加。
+        """
+        if table not in self.SOURCE_TABLES:
+            raise ValueError(f"不支持的表: {table}")
+        with self._update_lock:
+            arrays = self._snapshot['arrays']
+            if not self.meta['count'] or not len(ids):
+                return 0
+            rows = np.flatnonzero(
+                (arrays['tables.u8'] == self.SOURCE_TABLES.index(table))
+                & np.isin(arrays['ids.i64'], np.asarray(ids, dtype=np.int64))
+                & (arrays['deleted.u8'] == 0)
+            )
+            if len(rows):
+                deleted = np.memmap(self._path('deleted.u8'), dtype=np.uint8, mode='r+', shape=(self.meta['count'],))
+                deleted[rows] = 1
+                deleted.flush()
+                del deleted
+            return len(rows)
+
+    def remove_missing(self) -> int:
+        """删除索引中已不在数据库里的记录（例如被清理的旧会话），返回删除条数"""
+        removed = 0
+        arrays = self._snapshot['arrays']
+        for code, table in enumerate(self.SOURCE_TABLES):
+            with self.db.reader() as r:
+                if not r._table_columns(table):
+                    continue
+                existing = np.fromiter((row[0] for row in r.conn.execute(f"SELECT id FROM {table}")), dtype=np.int64)
+            indexed = arrays['ids.i64'][(arrays['tables.u8'] == code) & (arrays['deleted.u8'] == 0)]
+            removed += self.delete(table, indexed[~np.isin(indexed, existing)])
+        return removed
+
+    def _maybe_refresh(self):
+        """距上次更新超过 refresh_interval 时增量更新；其他线程正在更新时直接使用当前索引"""
+        if not self.refresh_interval or time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        if not self._update_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_refresh = time.monotonic()
+            self._update(2000)
+        except Exception as e:
+            print(f"⚠️  语义索引更新失败: {e}")
+        finally:
+            self._update_lock.release()
+
+    def _query_vector(self, query: str, df: Any, count: int) -> Optional[Any]:
+        """查询向量：哈希特征乘以 IDF 后归一化；没有任何特征时返回None"""
+        buckets = self._hash_features(text_features(query))
+        if not buckets:
+            return None
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for bucket, value in buckets.items():
+            vector[bucket] = value
+        vector *= np.log((count + 1) / (df + 1)) + 1
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        project: str = None,
+        tables: List[str] = SOURCE_TABLES,
+        min_score: float = 0.0,
+        exact: bool = False
+    ) -> List[Tuple[str, int, float]]:
+        """
+        返回与查询最相似的 k 条记录 [(表名, id, 相似度)]，按相似度降序
+
+        Args:
+            query: 查询文本
+            k: 返回条数
+            project: 只返回该项目的记录
+            tables: 只返回这些表的记录
+            min_score: 相似度下限
+            exact: 已建立近似最近邻索引时仍全量扫描
+        """
+        self._maybe_refresh()
+        snapshot = self._snapshot
+        count = snapshot['count']
+        if not count or k <= 0:
+            return []
+        vector = self._query_vector(query, snapshot['df'], count)
+        if vector is None:
+            return []
+
+        arrays = snapshot['arrays']
+        project_code = None
+        if project is not None:
+            if project not in self.meta['projects']:
+                return []
+            project_code = self.meta['projects'].index(project)
+        table_codes = None
+        if set(tables) != set(self.SOURCE_TABLES):
+            table_codes = [self.SOURCE_TABLES.index(table) for table in tables]
+
+        ivf = snapshot['ivf']
+        if ivf is not None and not exact:
+            # 只扫描最近的 nprobe 个簇；过滤后不足 k 条时扩大范围
+            nprobe = self.nprobe or max(8, ivf.nlist // 16)
+            while True:
+                rows = ivf.probe(vector, nprobe)
+                rows = rows[self._row_mask(arrays, rows, project_code, table_codes)]
+                if len(rows) >= k or nprobe >= ivf.nlist:
+                    break
+                nprobe *= 4
+            scores = arrays['vectors.f32'][rows] @ vector
+        else:
+            rows = None
+            scores = arrays['vectors.f32'] @ vector
+            scores[~self._row_mask(arrays, None, project_code, table_codes)] = -np.inf
+
+        k = min(k, len(scores))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [
+            (self.SOURCE_TABLES[arrays['tables.u8'][row]], int(arrays['ids.i64'][row]), float(scores[i]))
+            for i, row in ((i, i if rows is None else rows[i]) for i in top)
+            if scores[i] > min_score
+        ]
+
+    @staticmethod
+    def _row_mask(arrays: Dict[str, Any], rows: Any, project_code: Optional[int], table_codes: Optional[List[int]]) -> Any:
+        """rows（None 表示全部记录）中未删除且符合项目、表过滤条件的记录"""
+        def column(name):
+            return arrays[name] if rows is None else arrays[name][rows]
+
+        mask = column('deleted.u8') == 0
+        if project_code is not None:
+            mask &= column('projects.i32') == project_code
+        if table_codes is not None:
+            mask &= np.isin(column('tables.u8'), table_codes)
+        return mask
+
+    def search_records(
+        self,
+        query: str,
+        k: int = 10,
+        project: str = None,
+        conversation_type: str = 'both',
+        min_score: float = 0.0
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        语义搜索并读取完整记录，返回与 /api/search-conversations 相同结构的
+        {'user_prompts': [...], 'ai_responses': [...]}，每条记录附带 similarity
+        """
+        tables = {
+            'user': ['user_prompts'],
+            'ai': ['ai_responses'],
+        }.get(conversation_type, list(self.SOURCE_TABLES))
+        hits = self.search(query, k, project, tables, min_score)
+
+        results = {'user_prompts': [], 'ai_responses': []}
+        with self.db.reader() as r:
+            for table in tables:
+                table_hits = [(row_id, score) for hit_table, row_id, score in hits if hit_table == table]
+                records = r.get_records_by_ids(table, [row_id for row_id, _ in table_hits])
+                for row_id, score in table_hits:
+                    if row_id in records:
+                        results[table].append(dict(records[row_id], similarity=score))
+        return results
+
+
+def main():
+    """构建或更新语义索引，并可执行一次查询"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Claude-Mem 本地语义索引')
+    parser.add_argument('query', nargs='?', help='查询文本')
+    parser.add_argument('--db', help='数据库路径')
+    parser.add_argument('--index-dir', help='索引目录')
+    parser.add_argument('--project', help='只搜索该项目')
+    parser.add_argument('-k', type=int, default=10, help='返回条数')
+    args = parser.parse_args()
+
+    index = SemanticIndex(args.db, args.index_dir, refresh_interval=0)
+    try:
+        start = time.perf_counter()
+        added = index.update()
+        print(f"📦 新增 {added} 条，索引共 {len(index)} 条 ({time.perf_counter() - start:.2f}s)")
+
+        if args.query:
+            start = time.perf_counter()
+            hits = index.search(args.query, args.k, args.project)
+            print(f"🔍 查询耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+            for table, row_id, score in hits:
+                print(f"  {score:.3f} {table}#{row_id}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
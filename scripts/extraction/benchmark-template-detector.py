@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Benchmark the combined template detector against the per-pattern version.
+
+Builds a synthetic corpus shaped like filter-actual-xml.py input (many small
+nested blocks, long narratives, a share of template blocks and a few
+adversarial lines), checks that both detectors agree on every block and
+prints timings.
+
+Usage:
+    python3 scripts/extraction/benchmark-template-detector.py [--blocks N] [--seed S] [--repeat R]
+"""
+import argparse
+import random
+import time
+
+from template_detector import is_template, is_template_legacy
+
+WORDS = (
+    'the session observation database query index cache returns value error '
+    'fixed worker hook transcript summary prompt response tool file module '
+    'function test build path config timeout search result project'
+).split()
+
+TEMPLATE_SNIPPETS = [
+    '<title>[Short title capturing the core action]</title>',
+    '<type>[ change | discovery | decision ]</type>',
+    '<narrative>**title**: what happened</narrative>',
+    '<type>feature|bugfix|refactor</type>',
+    '<fact>Concise, self-contained statement</fact>',
+    '<request>What was the user trying to accomplish?</request>',
+    '<learned>What did you learn about the codebase?</learned>',
+    '<file>src/file1.ts</file>',
+    '<notes>Any additional context</notes>',
+    '<text>{placeholder}</text>',
+    '<narrative>... details go here ...</narrative>',
+]
+
+
+def sentence(rng, n):
+    return ' '.join(rng.choices(WORDS, k=n)).capitalize() + '.'
+
+
+def real_observation(rng):
+    facts = ''.join(f'<fact>{sentence(rng, rng.randint(5, 15))}</fact>' for _ in range(rng.randint(1, 5)))
+    files = ''.join(f'<file>src/{rng.choice(WORDS)}/{rng.choice(WORDS)}.ts</file>' for _ in range(rng.randint(0, 4)))
+    narrative = '\n'.join(sentence(rng, rng.randint(8, 25)) for _ in range(rng.randint(1, 40)))
+    return (
+        f'<observation><type>discovery</type><title>{sentence(rng, 6)}</title>'
+        f'<facts>{facts}</facts><files_read>{files}</files_read>'
+        f'<narrative>{narrative}</narrative></observation>'
+    )
+
+
+def build_corpus(blocks, seed):
+    """Return (name, blocks) groups of the synthetic corpus"""
+    rng = random.Random(seed)
+    real = [real_observation(rng) for _ in range(blocks)]
+    small = [f'<fact>{sentence(rng, rng.randint(5, 15))}</fact>' for _ in range(blocks * 4)]
+    templates = [
+        real_observation(rng).replace('</narrative>', rng.choice(TEMPLATE_SNIPPETS) + '</narrative>')
+        for _ in range(blocks // 10)
+    ]
+    # Long lines with many unmatched brackets: quadratic for \[.*?\]
+    adversarial = [
+        '<narrative>' + ' '.join(f'[{w}' for w in rng.choices(WORDS, k=1000)) + '</narrative>'
+        for _ in range(max(1, blocks // 200))
+    ]
+    return [
+        ('small blocks', small),
+        ('observations', real),
+        ('templates', templates),
+        ('adversarial', adversarial),
+    ]
+
+
+def time_detector(detector, blocks, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for block in blocks:
+            detector(block)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark template detection on a synthetic corpus')
+    parser.add_argument('--blocks', type=int, default=2000, help='Observations in the corpus (default: 2000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, best is reported (default: 3)')
+    args = parser.parse_args()
+
+    groups = build_corpus(args.blocks, args.seed)
+
+    print(f"{'corpus':<14} {'blocks':>7} {'MB':>7} {'templates':>9} {'legacy s':>9} {'combined s':>10} {'speedup':>8}")
+    for name, blocks in groups:
+        expected = [is_template_legacy(b) for b in blocks]
+        actual = [is_template(b) for b in blocks]
+        if expected != actual:
+            mismatch = next(i for i, (e, a) in enumerate(zip(expected, actual)) if e != a)
+            raise SystemExit(f"Detectors disagree on {name} block {mismatch}: {blocks[mismatch][:200]!r}")
+
+        legacy = time_detector(is_template_legacy, blocks, args.repeat)
+        combined = time_detector(is_template, blocks, args.repeat)
+        size_mb = sum(len(b) for b in blocks) / 1e6
+        print(f"{name:<14} {len(blocks):>7} {size_mb:>7.2f} {sum(actual):>9} "
+              f"{legacy:>9.4f} {combined:>10.4f} {legacy / combined:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
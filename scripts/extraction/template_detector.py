@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Detection of example/template XML in a single precompiled regex scan"""
+import re
+
+# The original indicator list, one re.search per pattern. Kept as the
+# reference behaviour for benchmark-template-detector.py.
+LEGACY_INDICATORS = [
+    r'\[.*?\]',  # Square brackets with placeholders
+    r'\*\*\w+\*\*:',  # Bold markdown like **title**:
+    r'\.\.\..*?\.\.\.',  # Ellipsis indicating placeholder
+    r'feature\|bugfix\|refactor',  # Multiple options separated by |
+    r'change \| discovery \| decision',  # Example types
+    r'\{.*?\}',  # Curly braces (template variables)
+    r'Concise, self-contained statement',  # Literal example text
+    r'Short title capturing',
+    r'One sentence explanation',
+    r'What was the user trying',
+    r'What code/systems did you explore',
+    r'What did you learn',
+    r'What was done',
+    r'What should happen next',
+    r'file1\.ts',  # Example filenames
+    r'file2\.ts',
+    r'file3\.ts',
+    r'Any additional context',
+]
+
+# Same matches as LEGACY_INDICATORS, combined into one alternation.
+#
+# - Bracket/brace placeholders exclude the opening character from the body,
+#   so a line full of unmatched '[' is scanned once instead of once per '['
+#   (a [...] pair exists on a line iff the innermost one does).
+# - Every branch starts with a literal character that is rare in prose, so
+#   the engine only tries the alternation at those positions. Literals that
+#   start with common letters are anchored on a later character and checked
+#   with a fixed-width lookbehind.
+TEMPLATE_PATTERN = re.compile(
+    r'\[[^\[\]\n]*\]'
+    r'|\{[^{}\n]*\}'
+    r'|\*\*\w+\*\*:'
+    r'|\.(?:\.\.[^\n]*?\.\.\.|ts(?<=file[123]\.ts))'
+    r'|\|(?:bugfix\|refactor(?<=feature\|bugfix\|refactor)'
+    r'| discovery \| decision(?<=change \| discovery \| decision))'
+    r'|What (?:was the user trying|code/systems did you explore|did you learn|was done|should happen next)'
+    r'|Concise, self-contained statement'
+    r'|Short title capturing'
+    r'|One sentence explanation'
+    r'|Any additional context'
+)
+
+
+def is_template(xml_block):
+    """Check if XML block is an example/template"""
+    return TEMPLATE_PATTERN.search(xml_block) is not None
+
+
+def is_template_legacy(xml_block):
+    """Reference implementation: one re.search per indicator"""
+    for pattern in LEGACY_INDICATORS:
+        if re.search(pattern, xml_block):
+            return True
+    return False
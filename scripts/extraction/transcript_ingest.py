@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""Parallel, incremental transcript ingestion shared by the extraction scripts"""
+import argparse
+import gzip
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional
+    zstandard = None
+
+# Fastest available JSON decoder; all of them accept bytes directly
+try:
+    import orjson
+    _loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    try:
+        import msgspec
+        _loads = msgspec.json.decode
+        JSON_BACKEND = 'msgspec'
+    except ImportError:
+        _loads = json.loads
+        JSON_BACKEND = 'json'
+
+DEFAULT_TRANSCRIPT_DIR = '~/.claude/projects/-Users-alexnewman-Scripts-claude-mem/'
+DEFAULT_CHUNK_MB = 8
+MANIFEST_VERSION = 2
+FOOTER = b'</transcript_extracts>\n'
+
+
+def decode_line(raw):
+    """Decode one JSONL line from bytes.
+
+    Raises ValueError if the line is not valid JSON. Lines with invalid
+    UTF-8 are retried with the bad bytes dropped, as the text-mode reader did.
+    """
+    try:
+        return _loads(raw)
+    except Exception:
+        pass
+    try:
+        return json.loads(raw.decode('utf-8', errors='ignore'))
+    except json.JSONDecodeError as e:
+        raise ValueError(str(e)) from None
+
+
+def may_contain_xml(raw):
+    """Byte-level check that a JSONL line can hold a tag (raw or \\u003c-escaped '<')"""
+    return b'<' in raw or b'\\u003c' in raw
+
+
+class TranscriptReader:
+    """Iterate JSON records of a transcript between two byte offsets.
+
+    After iteration, `offset` points just past the last complete line that
+    was consumed, so a later run can resume from there. A trailing line
+    without a newline is only consumed if it is already valid JSON (i.e. the
+    writer has finished it). With `end_offset`, reading stops at the first
+    line starting at or after it.
+
+    `prefilter`, if given, is called with the raw bytes of each complete line;
+    lines it rejects are skipped without being decoded.
+    """
+
+    def __init__(self, filepath, start_offset=0, end_offset=None, prefilter=None):
+        self.filepath = filepath
+        self.offset = start_offset
+        self.end_offset = end_offset
+        self.prefilter = prefilter
+
+    def __iter__(self):
+        with open(self.filepath, 'rb') as f:
+            f.seek(self.offset)
+            for raw in f:
+                if self.end_offset is not None and self.offset >= self.end_offset:
+                    return
+                complete = raw.endswith(b'\n')
+                if complete and self.prefilter is not None and not self.prefilter(raw):
+                    self.offset += len(raw)
+                    continue
+                try:
+                    data = decode_line(raw)
+                except ValueError:
+                    if not complete:
+                        # Partially written line, pick it up next run
+                        return
+                    self.offset += len(raw)
+                    continue
+                self.offset += len(raw)
+                yield data
+
+
+class Manifest:
+    """Per-file byte offsets and mtimes from the previous run, stored as JSON.
+
+    Also records where the previous run's footer starts in the output
+    (`output_offset`, in file bytes), how many uncompressed bytes precede it
+    (`logical_offset`) and the size of the index, so the next run can append.
+    """
+
+    def __init__(self, path, output=None, compression='none', output_offset=0,
+                 logical_offset=0, index_offset=0, block_count=0, files=None):
+        self.path = path
+        self.output = output
+        self.compression = compression
+        self.output_offset = output_offset
+        self.logical_offset = logical_offset
+        self.index_offset = index_offset
+        self.block_count = block_count
+        self.files = files or {}
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get('version') != MANIFEST_VERSION:
+            return cls(path)
+        return cls(
+            path,
+            output=data.get('output'),
+            compression=data.get('compression', 'none'),
+            output_offset=data.get('output_offset', 0),
+            logical_offset=data.get('logical_offset', 0),
+            index_offset=data.get('index_offset', 0),
+            block_count=data.get('block_count', 0),
+            files=data.get('files', {})
+        )
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'output': self.output,
+                'compression': self.compression,
+                'output_offset': self.output_offset,
+                'logical_offset': self.logical_offset,
+                'index_offset': self.index_offset,
+                'block_count': self.block_count,
+                'files': self.files
+            }, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def start_offset(self, filepath, stat):
+        """Byte offset to resume from, or None if the file is unchanged"""
+        entry = self.files.get(filepath)
+        if entry is None:
+            return 0
+        if stat.st_size == entry['offset'] and stat.st_mtime == entry['mtime']:
+            return None
+        return entry['offset']
+
+    def is_resumable(self, output, compression, index):
+        """Whether new blocks can be appended to an existing output file"""
+        return (
+            self.output == output
+            and self.compression == compression
+            and os.path.exists(output)
+            and os.path.getsize(output) >= self.output_offset > 0
+            and (index is None or (os.path.exists(index) and os.path.getsize(index) >= self.index_offset))
+        )
+
+
+class XmlFragmentWriter:
+    """Write extracted blocks to the output as they arrive.
+
+    The output may be plain, gzip or zstd. Compressed output is written as a
+    sequence of independent gzip members / zstd frames, and the closing
+    footer always goes in its own member, so a later run can truncate the
+    footer away and append. With an index path, one JSON line per block
+    records its offset and length in the uncompressed output.
+    """
+
+    def __init__(self, manifest, compression='none', index_path=None, header_comments=(), resume=False):
+        self.manifest = manifest
+        self.compression = compression
+        self._index = None
+        self.new_blocks = 0
+
+        if not resume:
+            manifest.output_offset = manifest.logical_offset = manifest.index_offset = 0
+            manifest.block_count = 0
+            # Persist the reset before truncating the output: if the rebuild
+            # crashes, the next run must not resume from the old offsets
+            manifest.save()
+
+        self._raw = open(manifest.output, 'r+b' if resume else 'wb')
+        if resume:
+            self._raw.seek(manifest.output_offset)
+            self._raw.truncate()
+
+        if index_path:
+            self._index = open(index_path, 'r+b' if resume else 'wb')
+            self._index.seek(manifest.index_offset)
+            self._index.truncate()
+
+        self._stream = self._open_member()
+        self.position = manifest.logical_offset
+        if not resume:
+            self._write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+            for comment in header_comments:
+                self._write(f'<!-- {comment} -->\n'.encode('utf-8'))
+            self._write(b'<transcript_extracts>\n\n')
+
+    def _open_member(self):
+        if self.compression == 'gzip':
+            return gzip.GzipFile(fileobj=self._raw, mode='wb')
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+        return self._raw
+
+    def _close_member(self):
+        if self._stream is not self._raw:
+            self._stream.close()
+
+    def _write(self, data):
+        self._stream.write(data)
+        self.position += len(data)
+
+    def write_block(self, item, source=None):
+        self.manifest.block_count += 1
+        self.new_blocks += 1
+        self._write(f"<!-- Block {self.manifest.block_count} | {format_timestamp(item['timestamp'])} -->\n".encode('utf-8'))
+        xml = item['xml'].encode('utf-8')
+        if self._index:
+            entry = {
+                'block': self.manifest.block_count,
+                'offset': self.position,
+                'length': len(xml),
+                'timestamp': item['timestamp'],
+                'source': source
+            }
+            self._index.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+        self._write(xml)
+        self._write(b'\n\n')
+
+    def close(self):
+        """Finish the current member, then write the footer in its own member"""
+        self._close_member()
+        self.manifest.output_offset = self._raw.tell()
+        self.manifest.logical_offset = self.position
+        self._stream = self._open_member()
+        self._stream.write(FOOTER)
+        self._close_member()
+        self._raw.close()
+        if self._index:
+            self.manifest.index_offset = self._index.tell()
+            self._index.close()
+
+
+def find_transcripts(directory, max_files=None):
+    """All .jsonl transcripts in a directory tree, newest first"""
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith('.jsonl'):
+                paths.append(os.path.join(root, name))
+    paths.sort(key=os.path.getmtime, reverse=True)
+    return paths[:max_files] if max_files else paths
+
+
+def plan_chunks(filepath, start_offset, size, chunk_size):
+    """Split [start_offset, size) into line-aligned (start, end) ranges; the last end is None"""
+    with open(filepath, 'rb') as f:
+        pos = start_offset
+        while pos < size:
+            f.seek(pos + chunk_size)
+            f.readline()
+            end = f.tell()
+            if end >= size:
+                yield pos, None
+                return
+            yield pos, end
+            pos = end
+
+
+def format_timestamp(timestamp):
+    """Format an ISO timestamp for the block comment"""
+    if timestamp != 'unknown' and timestamp:
+        try:
+            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            return dt.strftime('%Y-%m-%d %H:%M:%S UTC')
+        except (ValueError, AttributeError):
+            return timestamp
+    return 'unknown'
+
+
+def _process(args):
+    process_file, filepath, start_offset, end_offset = args
+    results, reached = process_file(filepath, start_offset, end_offset)
+    return filepath, start_offset, end_offset, reached, results
+
+
+def bounded_map(executor, fn, jobs, window):
+    """Like executor.map, but keeps at most `window` jobs in flight so
+    finished results never pile up faster than they are consumed"""
+    pending = deque()
+    for job in jobs:
+        pending.append(executor.submit(fn, job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def detect_compression(output, requested):
+    if requested != 'auto':
+        return requested
+    if output.endswith('.gz'):
+        return 'gzip'
+    if output.endswith('.zst'):
+        return 'zstd'
+    return 'none'
+
+
+def parse_args(description, default_output):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--transcript-dir', '-d', default=DEFAULT_TRANSCRIPT_DIR,
+                        help=f'Directory searched recursively for .jsonl transcripts (default: {DEFAULT_TRANSCRIPT_DIR})')
+    parser.add_argument('--output', '-o', default=default_output,
+                        help=f'Output XML file (default: {default_output})')
+    parser.add_argument('--compress', choices=['auto', 'none', 'gzip', 'zstd'], default='auto',
+                        help='Output compression (default: from the output suffix, .gz or .zst)')
+    parser.add_argument('--index', action='store_true',
+                        help='Also write <output>.index.jsonl with the offset of every block')
+    parser.add_argument('--manifest', help='Manifest path (default: <output>.manifest.json)')
+    parser.add_argument('--workers', '-j', type=int, default=os.cpu_count(),
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_MB,
+                        help=f'Split transcripts into chunks of about this many MB (default: {DEFAULT_CHUNK_MB})')
+    parser.add_argument('--max-files', type=int, help='Only process the N most recently modified transcripts')
+    parser.add_argument('--full', action='store_true', help='Ignore the manifest and rebuild the output from scratch')
+    return parser.parse_args()
+
+
+def run_extraction(process_file, description, default_output, header_comments=(), block_label='XML blocks'):
+    """Command-line entry point shared by the extraction scripts.
+
+    `process_file(filepath, start_offset, end_offset)` must be a module-level
+    function returning `(results, reached_offset)` for the lines in that byte
+    range, where results are dicts with 'timestamp' and 'xml'. Transcripts
+    are split into line-aligned chunks processed across a process pool, and
+    only bytes appended since the last run are parsed. Blocks are written to
+    the output as chunks complete, with a bounded number of chunks in flight,
+    so memory does not grow with the size of the archive.
+
+    Returns (new_block_count, total_block_count, output_path).
+    """
+    args = parse_args(description, default_output)
+    transcript_dir = os.path.expanduser(args.transcript_dir)
+    output_file = os.path.abspath(os.path.expanduser(args.output))
+    manifest_path = os.path.expanduser(args.manifest) if args.manifest else output_file + '.manifest.json'
+    index_path = output_file + '.index.jsonl' if args.index else None
+    compression = detect_compression(output_file, args.compress)
+    if compression == 'zstd' and zstandard is None:
+        raise SystemExit('zstd output requires the zstandard package: pip install zstandard')
+
+    manifest = Manifest.load(manifest_path)
+    files = find_transcripts(transcript_dir, args.max_files)
+
+    resume = not args.full and manifest.is_resumable(output_file, compression, index_path)
+    if resume:
+        for filepath in files:
+            entry = manifest.files.get(filepath)
+            if entry and os.path.getsize(filepath) < entry['offset']:
+                print(f"{os.path.basename(filepath)} was truncated, rebuilding output")
+                resume = False
+                break
+    if not resume:
+        manifest = Manifest(manifest_path, output=output_file, compression=compression)
+
+    updated = []
+    for filepath in files:
+        stat = os.stat(filepath)
+        start_offset = manifest.start_offset(filepath, stat)
+        if start_offset is not None:
+            updated.append((filepath, start_offset, stat.st_size))
+
+    print(f"{len(updated)} of {len(files)} transcripts have new data (JSON decoder: {JSON_BACKEND})")
+
+    def jobs():
+        for filepath, start_offset, size in updated:
+            for chunk_start, chunk_end in plan_chunks(filepath, start_offset, size, args.chunk_mb * 1024 * 1024):
+                yield process_file, filepath, chunk_start, chunk_end
+
+    writer = XmlFragmentWriter(manifest, compression, index_path, header_comments, resume)
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for filepath, start_offset, end_offset, reached, results in bounded_map(
+                    executor, _process, jobs(), window=2 * (args.workers or os.cpu_count() or 1)):
+                resumed = f" (from byte {start_offset})" if start_offset else ''
+                print(f"Processed {os.path.basename(filepath)}{resumed}: {len(results)} {block_label}")
+
+                for item in results:
+                    writer.write_block(item, source=os.path.basename(filepath))
+
+                if end_offset is None:
+                    stat = os.stat(filepath)
+                    manifest.files[filepath] = {
+                        'offset': reached,
+                        'size': stat.st_size,
+                        'mtime': stat.st_mtime if reached == stat.st_size else None
+                    }
+    finally:
+        writer.close()
+
+    manifest.save()
+    return writer.new_blocks, manifest.block_count, output_file
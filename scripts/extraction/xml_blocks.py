@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Single-pass extraction of XML blocks from transcript text"""
+import re
+
+# Tags extracted by extract-all-xml.py
+BASE_TAGS = [
+    'observation',
+    'session_summary',
+    'request',
+    'summary',
+    'facts',
+    'fact',
+    'concepts',
+    'concept',
+    'files',
+    'file',
+    'files_read',
+    'files_edited',
+    'files_modified',
+    'narrative',
+    'learned',
+    'investigated',
+    'completed',
+    'next_steps',
+    'notes',
+    'title',
+    'subtitle',
+    'text',
+    'type',
+]
+
+# filter-actual-xml.py additionally extracts tool call blocks
+TOOL_TAGS = [
+    'tool_used',
+    'tool_name',
+    'tool_input',
+    'tool_output',
+    'tool_time',
+]
+
+
+class XmlBlockExtractor:
+    """Extract complete <tag>...</tag> blocks for a fixed set of tags in one scan.
+
+    Equivalent to running re.findall(r'<tag>.*?</tag>', text, re.DOTALL) for
+    every tag and concatenating the results in tag order, but the text is
+    scanned once with a single compiled pattern. Nested blocks of different
+    tags (e.g. <facts> and each inner <fact>) are all returned.
+    """
+
+    def __init__(self, tags):
+        self.tags = list(tags)
+        self._order = {tag: i for i, tag in enumerate(self.tags)}
+        # Longest names first so e.g. files_read is tried before files
+        names = sorted(self.tags, key=len, reverse=True)
+        self._pattern = re.compile(r'<(/?)(' + '|'.join(re.escape(n) for n in names) + r')>')
+
+    def extract(self, text):
+        """Return all blocks, grouped by tag order and then by position"""
+        if '<' not in text:
+            return []
+
+        # Start of the earliest unclosed opening tag per name. Like a lazy
+        # .*? match, later opens of the same tag are ignored until it closes.
+        pending = {}
+        found = []
+        for match in self._pattern.finditer(text):
+            closing, tag = match.groups()
+            if not closing:
+                if tag not in pending:
+                    pending[tag] = match.start()
+            elif tag in pending:
+                start = pending.pop(tag)
+                found.append((self._order[tag], start, text[start:match.end()]))
+
+        found.sort(key=lambda item: (item[0], item[1]))
+        return [block for _, _, block in found]
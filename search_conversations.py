@@ -8,18 +8,90 @@ import requests
 import json
 from typing import List, Dict, Optional, Any
 import argparse
-import sys
+import asyncio
+import base64
+
+try:
+    import aiohttp
+except ImportError:  # 异步客户端为可选功能
+    aiohttp = None
+
+
+# 各对话来源在分页游标中的键
+CONVERSATION_SOURCES = {'user': 'user_prompts', 'ai': 'ai_responses'}
+
+# 单次API请求的默认超时（秒）
+DEFAULT_TIMEOUT = 10
+
+
+def build_search_params(
+    keywords: List[str] = None,
+    project: str = None,
+    conversation_type: str = 'both',
+    logic: str = 'AND',
+    limit: int = 50,
+    cursor: str = None
+) -> Dict[str, Any]:
+    """构建 /api/search-conversations 的查询参数
+    
+    worker 的搜索接口不解析 cursor，转发后会静默返回第一页，因此HTTP模式下不接受游标。
+    """
+    if cursor:
+        raise ValueError("HTTP API 不支持游标翻页，请通过 db_path (--db) 直接读取数据库")
+    
+    params = {
+        'limit': limit,
+        'conversation_type': conversation_type,
+        'logic': logic
+    }
+    
+    if project:
+        params['project'] = project
+        
+    if keywords:
+        params['keywords'] = ','.join(keywords)
+    
+    return params
+
+
+def empty_search_result() -> Dict[str, Any]:
+    """请求失败时返回的空结果"""
+    return {'user_prompts': [], 'ai_responses': [], 'next_cursor': None}
+
+
+def encode_page_cursor(cursors: Dict[str, str]) -> str:
+    """将各来源的游标打包为一个不透明的翻页令牌"""
+    raw = json.dumps(cursors, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_page_cursor(token: str) -> Dict[str, str]:
+    """解析翻页令牌，返回 {来源: 游标}"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursors = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"无效的翻页令牌: {token}") from e
+    if not isinstance(cursors, dict):
+        raise ValueError(f"无效的翻页令牌: {token}")
+    return cursors
 
 
 class ClaudeMemConversationSearcher:
-    def __init__(self, base_url: str = "http://localhost:37777"):
+    def __init__(self, base_url: str = "http://localhost:37777", db_path: str = None):
         """初始化搜索器
         
         Args:
             base_url: Claude-Mem API基础URL
+            db_path: 直接读取的SQLite数据库路径；设置后不再经过HTTP API，
+                     并使用 (created_at_epoch, id) 键集分页
         """
         self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
+        self.db = None
+        if db_path:
+            from claude_mem_db_tool import ClaudeMemDB
+            self.db = ClaudeMemDB(db_path)
     
     def search_conversations(
         self,
@@ -27,7 +99,8 @@ class ClaudeMemConversationSearcher:
         project: str = None,
         conversation_type: str = 'both',  # 'user', 'ai', 'both'
         logic: str = 'AND',
-        limit: int = 50
+        limit: int = 50,
+        cursor: str = None
     ) -> Dict[str, Any]:
         """搜索对话记录
         
@@ -37,33 +110,76 @@ class ClaudeMemConversationSearcher:
             conversation_type: 对话类型 ('user', 'ai', 'both')
             logic: 关键字匹配逻辑 ('AND', 'OR')
             limit: 返回记录数限制
+            cursor: 翻页令牌，取自上一页结果的 'next_cursor'；只在 db_path 模式下可用，
+                HTTP模式下传入会抛出 ValueError
         
         Returns:
-            包含用户对话和AI回复的字典
+            包含用户对话和AI回复的字典；'next_cursor' 为下一页令牌，
+            没有更多结果时为None
         """
-        params = {
-            'limit': limit,
-            'conversation_type': conversation_type,
-            'logic': logic
-        }
+        if self.db:
+            return self._search_local(keywords, project, conversation_type, logic, limit, cursor)
         
-        if project:
-            params['project'] = project
-            
-        if keywords:
-            params['keywords'] = ','.join(keywords)
+        params = build_search_params(keywords, project, conversation_type, logic, limit, cursor)
         
         try:
             response = self.session.get(
                 f"{self.base_url}/api/search-conversations",
                 params=params,
-                timeout=10
+                timeout=DEFAULT_TIMEOUT
             )
             response.raise_for_status()
-            return response.json()
+            data = response.json()
+            data.setdefault('next_cursor', None)
+            return data
         except requests.exceptions.RequestException as e:
             print(f"❌ API请求失败: {e}")
-            return {'user_prompts': [], 'ai_responses': []}
+            return empty_search_result()
+    
+    def _search_local(
+        self,
+        keywords: Optional[List[str]],
+        project: Optional[str],
+        conversation_type: str,
+        logic: str,
+        limit: int,
+        cursor: Optional[str]
+    ) -> Dict[str, Any]:
+        """直接查询本地数据库，按 (created_at_epoch, id) 键集分页"""
+        if cursor:
+            # 令牌中只保留仍有后续结果的来源
+            cursors = decode_page_cursor(cursor)
+        else:
+            cursors = {
+                source: None for type_, source in CONVERSATION_SOURCES.items()
+                if conversation_type in (type_, 'both')
+            }
+        
+        results = {'user_prompts': [], 'ai_responses': []}
+        if 'user_prompts' in cursors:
+            results['user_prompts'] = self.db.search_user_prompts_with_keywords(
+                keywords=keywords,
+                logic=logic,
+                project=project,
+                limit=limit,
+                cursor=cursors['user_prompts']
+            )
+        if 'ai_responses' in cursors:
+            results['ai_responses'] = self.db.search_ai_responses(
+                keywords=keywords,
+                logic=logic,
+                project=project,
+                limit=limit,
+                cursor=cursors['ai_responses']
+            )
+        
+        next_cursors = {
+            source: self.db.next_cursor(results[source])
+            for source in cursors
+            if len(results[source]) >= limit
+        }
+        results['next_cursor'] = encode_page_cursor(next_cursors) if next_cursors else None
+        return results
     
     def search_user_prompts(
         self,
@@ -160,6 +276,122 @@ class ClaudeMemConversationSearcher:
             raise ValueError(f"不支持的导出格式: {format}")
 
 
+class AsyncClaudeMemConversationSearcher:
+    """
+    基于 asyncio/aiohttp 的对话搜索客户端
+    
+    所有请求共用一个 aiohttp 会话（保持长连接），并发数由信号量限制，
+    每个请求都有独立的超时。需要安装 aiohttp。
+    
+        async with AsyncClaudeMemConversationSearcher(max_concurrency=16) as searcher:
+            results = await searcher.search_projects(projects, keywords=['bug'])
+    """
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:37777",
+        max_concurrency: int = 10,
+        timeout: float = DEFAULT_TIMEOUT
+    ):
+        """初始化异步搜索器
+        
+        Args:
+            base_url: Claude-Mem API基础URL
+            max_concurrency: 同时进行的最大请求数
+            timeout: 单个请求的默认超时（秒）
+        """
+        if aiohttp is None:
+            raise ImportError("异步客户端需要 aiohttp: pip install aiohttp")
+        
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+    
+    async def __aenter__(self) -> 'AsyncClaudeMemConversationSearcher':
+        await self._ensure_session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
+    async def _ensure_session(self) -> 'aiohttp.ClientSession':
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+    
+    async def close(self):
+        """关闭底层HTTP会话"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def search_conversations(
+        self,
+        keywords: List[str] = None,
+        project: str = None,
+        conversation_type: str = 'both',
+        logic: str = 'AND',
+        limit: int = 50,
+        cursor: str = None,
+        timeout: float = None
+    ) -> Dict[str, Any]:
+        """搜索对话记录，参数同 ClaudeMemConversationSearcher.search_conversations
+        
+        Args:
+            timeout: 本次请求的超时（秒），默认使用构造时的 timeout
+        """
+        params = build_search_params(keywords, project, conversation_type, logic, limit, cursor)
+        session = await self._ensure_session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout if timeout is not None else self.timeout)
+        
+        async with self._semaphore:
+            try:
+                async with session.get(
+                    f"{self.base_url}/api/search-conversations",
+                    params=params,
+                    timeout=client_timeout
+                ) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+                    data.setdefault('next_cursor', None)
+                    return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"❌ API请求失败: {e!r}")
+                return empty_search_result()
+    
+    async def search_many(
+        self,
+        queries: List[Dict[str, Any]],
+        timeout: float = None
+    ) -> List[Dict[str, Any]]:
+        """并发执行多个搜索
+        
+        Args:
+            queries: 每项为 search_conversations 的关键字参数
+            timeout: 每个请求的默认超时，可在单个查询中用 'timeout' 覆盖
+        
+        Returns:
+            与 queries 顺序一致的结果列表，失败的查询返回空结果
+        """
+        tasks = [
+            self.search_conversations(**{'timeout': timeout, **query})
+            for query in queries
+        ]
+        return await asyncio.gather(*tasks)
+    
+    async def search_projects(
+        self,
+        projects: List[str],
+        **kwargs
+    ) -> Dict[str, Dict[str, Any]]:
+        """对多个项目执行同一搜索，返回 {项目: 结果}"""
+        results = await self.search_many([{**kwargs, 'project': project} for project in projects])
+        return dict(zip(projects, results))
+
+
 def main():
     """命令行工具主函数"""
     parser = argparse.ArgumentParser(
@@ -178,6 +410,9 @@ def main():
   
   # 导出搜索结果
   python3 search_conversations.py --keywords error --export json --output results.json
+  
+  # 直接读取数据库并翻到下一页（令牌取自上一页输出）
+  python3 search_conversations.py --db ~/.claude-mem/claude-mem.db --project my-project --cursor <令牌>
         """
     )
     
@@ -220,6 +455,16 @@ def main():
         help='Claude-Mem API地址 (默认: http://localhost:37777)'
     )
     
+    parser.add_argument(
+        '--db',
+        help='直接读取的SQLite数据库路径（不经过HTTP API）'
+    )
+    
+    parser.add_argument(
+        '--cursor', '-c',
+        help='翻页令牌（取自上一页输出的"下一页令牌"）'
+    )
+    
     parser.add_argument(
         '--export',
         choices=['json', 'markdown'],
@@ -239,13 +484,16 @@ def main():
     
     args = parser.parse_args()
     
+    if args.cursor and not args.db:
+        parser.error('--cursor 需要配合 --db 使用，HTTP API 不支持游标翻页')
+    
     # 解析关键字
     keywords = None
     if args.keywords:
         keywords = [k.strip() for k in args.keywords.split(',') if k.strip()]
     
     # 初始化搜索器
-    searcher = ClaudeMemConversationSearcher(args.url)
+    searcher = ClaudeMemConversationSearcher(args.url, db_path=args.db)
     
     # 执行搜索
     if not args.quiet:
@@ -263,7 +511,8 @@ def main():
         project=args.project,
         conversation_type=args.type,
         logic=args.logic,
-        limit=args.limit
+        limit=args.limit,
+        cursor=args.cursor
     )
     
     # 输出结果
@@ -280,6 +529,9 @@ def main():
                 print(f"✅ 结果已保存到: {args.output}")
         else:
             print(formatted_output)
+    
+    if results.get('next_cursor') and not args.quiet:
+        print(f"\n➡️  下一页令牌: {results['next_cursor']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,336 @@
+"""
+claude_mem_db_tool.ClaudeMemDB 的回归测试
+
+运行: python3 -m unittest discover -s tests/python
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from claude_mem_db_tool import ClaudeMemDB, load_checkpoint, save_checkpoint  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE sdk_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, claude_session_id TEXT UNIQUE, sdk_session_id TEXT, project TEXT
+);
+CREATE TABLE user_prompts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, claude_session_id TEXT, prompt_number INTEGER,
+    prompt_text TEXT, created_at TEXT, created_at_epoch INTEGER
+);
+CREATE TABLE ai_responses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, claude_session_id TEXT, sdk_session_id TEXT, project TEXT,
+    prompt_number INTEGER, response_text TEXT, response_type TEXT, tool_name TEXT, tool_input TEXT,
+    tool_output TEXT, created_at TEXT, created_at_epoch INTEGER
+);
+CREATE TABLE tool_executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, ai_response_id INTEGER, claude_session_id TEXT, sdk_session_id TEXT,
+    project TEXT, prompt_number INTEGER, tool_name TEXT, tool_input TEXT, tool_output TEXT,
+    tool_duration_ms INTEGER, files_created TEXT, files_modified TEXT, files_read TEXT, files_deleted TEXT,
+    error_message TEXT, success INTEGER, created_at TEXT, created_at_epoch INTEGER
+);
+"""
+
+# 汉字与英文相连、含下划线和大小写混合，覆盖各种分词边界
+WORDS = [
+    'python', 'database', 'React', 'ERR_042', 'file_path', 'src/foo.ts', 'cache',
+    '数据库', '连接', '问题', '组件', '渲染', '优化', 'Élan', 'timeout'
+]
+PROJECTS = ['alpha', 'beta', None]
+
+
+def random_text(rng: random.Random) -> str:
+    text = rng.choice(WORDS)
+    for word in (rng.choice(WORDS) for _ in range(rng.randrange(3, 12))):
+        cjk = ord(text[-1]) > 0x2e80 or ord(word[0]) > 0x2e80
+        text += ('' if cjk and rng.random() < 0.7 else ' ') + word
+    return text
+
+
+class DatabaseTestCase(unittest.TestCase):
+    ROWS = 400
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'claude-mem.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(SCHEMA)
+        rng = random.Random(0)
+        for s in range(12):
+            conn.execute(
+                "INSERT INTO sdk_sessions (claude_session_id, sdk_session_id, project) VALUES (?, ?, ?)",
+                (f"cs{s}", f"sdk{s}", PROJECTS[s % 3])
+            )
+        for i in range(self.ROWS):
+            s = rng.randrange(12)
+            # 每3条记录共用一个时间戳，分页必须靠id区分
+            epoch = 1_700_000_000_000 + (i // 3) * 1000
+            created_at = f"2023-11-{1 + i // 100:02d}T00:00:{i % 60:02d}Z"
+            text = random_text(rng)
+            conn.execute(
+                "INSERT INTO ai_responses (claude_session_id, sdk_session_id, project, prompt_number, response_text, "
+                "response_type, tool_name, tool_input, tool_output, created_at, created_at_epoch) "
+                "VALUES (?, ?, ?, ?, ?, 'assistant', NULL, '{}', '', ?, ?)",
+                (f"cs{s}", f"sdk{s}", PROJECTS[s % 3], i % 10, text, created_at, epoch)
+            )
+            conn.execute(
+                "INSERT INTO user_prompts (claude_session_id, prompt_number, prompt_text, created_at, created_at_epoch) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (f"cs{s}", i % 10, random_text(rng), created_at, epoch)
+            )
+            conn.execute(
+                "INSERT INTO tool_executions (ai_response_id, claude_session_id, sdk_session_id, project, prompt_number, "
+                "tool_name, tool_input, tool_output, error_message, success, created_at, created_at_epoch) "
+                "VALUES (?, ?, ?, ?, ?, 'Bash', ?, ?, ?, 1, ?, ?)",
+                (i + 1, f"cs{s}", f"sdk{s}", PROJECTS[s % 3], i % 10, random_text(rng), random_text(rng),
+                 random_text(rng) if i % 4 == 0 else None, created_at, epoch)
+            )
+        conn.commit()
+        conn.close()
+        self.db = self.open()
+
+    def tearDown(self):
+        with redirect_stdout(StringIO()):
+            self.db.close()
+        shutil.rmtree(self.tmpdir)
+
+    def open(self, **kwargs) -> ClaudeMemDB:
+        with redirect_stdout(StringIO()):
+            return ClaudeMemDB(self.db_path, **kwargs)
+
+    def like_ids(self, table: str, columns, keywords, logic: str) -> list:
+        """直接用LIKE查询的结果，作为各种索引路径的参照"""
+        per_keyword = [
+            '(' + ' OR '.join(f"{column} LIKE ?" for column in columns) + ')'
+            for _ in keywords
+        ]
+        params = [f"%{keyword}%" for keyword in keywords for _ in columns]
+        operator = ' AND ' if logic == 'AND' else ' OR '
+        rows = self.db.conn.execute(
+            f"SELECT id FROM {table} WHERE {operator.join(per_keyword)} ORDER BY id", params
+        )
+        return [row[0] for row in rows]
+
+    def insert_response(self, session: str, project, created_at: str, text: str = 'new', epoch: int = 1) -> int:
+        cursor = self.db.conn.execute(
+            "INSERT INTO ai_responses (claude_session_id, project, response_text, created_at, created_at_epoch) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (session, project, text, created_at, epoch)
+        )
+        self.db.conn.commit()
+        return cursor.lastrowid
+
+
+class KeysetPaginationTest(DatabaseTestCase):
+    def test_pages_cover_all_rows_in_order(self):
+        expected = [
+            row[0] for row in self.db.conn.execute(
+                "SELECT id FROM ai_responses WHERE project = 'alpha' ORDER BY created_at_epoch DESC, id DESC"
+            )
+        ]
+        seen = []
+        cursor = None
+        while True:
+            page = self.db.search_ai_responses(project='alpha', limit=7, cursor=cursor)
+            if not page:
+                break
+            seen.extend(row['id'] for row in page)
+            cursor = self.db.next_cursor(page)
+        self.assertEqual(seen, expected)
+
+    def test_cursor_is_stable_across_inserts(self):
+        first = self.db.search_ai_responses(limit=10)
+        self.insert_response('cs0', 'alpha', '2024-01-01T00:00:00Z', epoch=2_000_000_000_000)
+        second = self.db.search_ai_responses(limit=10, cursor=self.db.next_cursor(first))
+        expected = self.db.search_ai_responses(limit=21)
+        # 新记录排在最前，游标之后的结果不会因此错位
+        self.assertEqual([row['id'] for row in second], [row['id'] for row in expected[11:21]])
+
+
+class TrigramPrefilterTest(DatabaseTestCase):
+    CASES = [
+        (['python'], 'AND'),
+        (['ERR_042'], 'AND'),
+        (['file_path', 'react'], 'OR'),
+        (['Élan', 'cache'], 'AND'),
+        (['%foo%ts'], 'AND'),
+        (['py', 'timeout'], 'AND'),
+        (['py', 'timeout'], 'OR'),
+        (['数据库连接'], 'AND'),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        with redirect_stdout(StringIO()):
+            self.db.ensure_trigram_indexes()
+        # 候选比例上限放宽到100%，保证每个用例都经过索引
+        self.db.TRIGRAM_MAX_CANDIDATE_RATIO = 1.0
+
+    def test_searches_do_not_create_indexes(self):
+        db = self.open()
+        db.conn.execute("DROP TABLE ai_responses_trigram")
+        db._fts_ready.clear()
+        db.search_ai_responses(keywords=['python'])
+        exists = db.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'ai_responses_trigram'").fetchone()
+        self.assertIsNone(exists)
+
+    def test_matches_like(self):
+        for keywords, logic in self.CASES:
+            with self.subTest(keywords=keywords, logic=logic):
+                routed = self.db._trigram_prefilter('ai_responses', keywords, logic)
+                if all(len(k) >= 3 for k in keywords) or logic == 'AND':
+                    self.assertIsNotNone(routed)
+                ai = sorted(r['id'] for r in self.db.search_ai_responses(keywords=keywords, logic=logic, limit=10**6))
+                self.assertEqual(ai, self.like_ids('ai_responses', ['response_text'], keywords, logic))
+                prompts = sorted(
+                    r['id'] for r in self.db.search_user_prompts_with_keywords(keywords, logic=logic, limit=10**6)
+                )
+                self.assertEqual(prompts, self.like_ids('user_prompts', ['prompt_text'], keywords, logic))
+
+    def test_tool_executions_match_like(self):
+        columns = ['tool_input', 'tool_output', 'error_message']
+        for keywords in (['ERR_042'], ['react', 'timeout']):
+            with self.subTest(keywords=keywords):
+                rows = sorted(r['id'] for r in self.db.get_tool_executions(keywords=keywords, limit=10**6))
+                self.assertEqual(rows, self.like_ids('tool_executions', columns, keywords, 'OR'))
+
+    def test_new_rows_are_indexed_by_triggers(self):
+        row_id = self.insert_response('cs0', 'alpha', '2024-01-01T00:00:00Z', 'brand_new_marker')
+        rows = self.db.search_ai_responses(keywords=['brand_new_marker'])
+        self.assertEqual([row['id'] for row in rows], [row_id])
+
+
+class CjkIndexTest(DatabaseTestCase):
+    CASES = [(['数据库连接'], 'AND'), (['react'], 'AND'), (['组件渲染', 'python'], 'OR'), (['库'], 'AND')]
+
+    def check_matches_like(self):
+        for keywords, logic in self.CASES:
+            with self.subTest(keywords=keywords, logic=logic):
+                ai = sorted(r['id'] for r in self.db.search_with_fts(keywords, logic=logic, limit=10**6))
+                self.assertEqual(ai, self.like_ids('ai_responses', ['response_text'], keywords, logic))
+                prompts = sorted(
+                    r['id'] for r in self.db.search_user_prompts_with_keywords(
+                        keywords, logic=logic, limit=10**6, use_fts=True
+                    )
+                )
+                self.assertEqual(prompts, self.like_ids('user_prompts', ['prompt_text'], keywords, logic))
+
+    def test_matches_like_with_index(self):
+        with redirect_stdout(StringIO()):
+            self.assertEqual(self.db.ensure_cjk_indexes(), ['ai_responses_cjk', 'user_prompts_cjk'])
+            # 索引之后新增的记录通过LIKE补齐
+            self.insert_response('cs0', 'alpha', '2024-01-01T00:00:00Z', '修复数据库连接React组件渲染')
+            self.check_matches_like()
+
+    def test_cjk_keywords_fall_back_to_like_without_index(self):
+        keywords = ['数据库连接']
+        with redirect_stdout(StringIO()):
+            ai = sorted(r['id'] for r in self.db.search_with_fts(keywords, limit=10**6))
+        self.assertEqual(ai, self.like_ids('ai_responses', ['response_text'], keywords, 'AND'))
+        exists = self.db.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'ai_responses_cjk'").fetchone()
+        self.assertIsNone(exists)
+
+
+class ProjectStatsTest(DatabaseTestCase):
+    def live_stats(self) -> list:
+        rows = self.db.conn.execute("""
+            SELECT project, COUNT(*) AS ai_response_count, COUNT(DISTINCT claude_session_id) AS session_count,
+                   MIN(created_at) AS earliest_response, MAX(created_at) AS latest_response
+            FROM ai_responses WHERE project IS NOT NULL GROUP BY project ORDER BY project
+        """)
+        return [dict(row) for row in rows]
+
+    def assert_stats_match(self):
+        live = self.live_stats()
+        self.assertEqual(self.db.get_all_project_stats(), live)
+        self.assertEqual(self.db.get_projects(), [row['project'] for row in live])
+        for row in live:
+            expected = {key: value for key, value in row.items() if key != 'project'}
+            self.assertEqual(self.db.get_project_stats(row['project']), expected)
+        total = dict(self.db.conn.execute("""
+            SELECT COUNT(*) AS ai_response_count, COUNT(DISTINCT claude_session_id) AS session_count,
+                   MIN(created_at) AS earliest_response, MAX(created_at) AS latest_response
+            FROM ai_responses
+        """).fetchone())
+        self.assertEqual(self.db.get_project_stats(), total)
+
+    def test_reads_do_not_write(self):
+        changes = self.db.conn.total_changes
+        self.assert_stats_match()
+        self.assertEqual(self.db.conn.total_changes, changes)
+        exists = self.db.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'project_stats'").fetchone()
+        self.assertIsNone(exists)
+
+    def test_fresh_after_insert(self):
+        self.assertEqual(self.db.refresh_project_stats(), self.ROWS)
+        self.insert_response('cs0', 'alpha', '2030-01-01T00:00:00Z')
+        self.insert_response('brand-new-session', 'alpha', '2000-01-01T00:00:00Z')
+        self.insert_response('cs1', 'gamma', '2024-01-01T00:00:00Z')
+        self.assertEqual(self.db._project_stats_ready(), self.ROWS)
+        self.assert_stats_match()
+        self.assertEqual(self.db.refresh_project_stats(), 3)
+        self.assert_stats_match()
+
+    def test_delete_and_update_fall_back_until_refresh(self):
+        self.db.refresh_project_stats()
+        self.db.conn.execute("DELETE FROM ai_responses WHERE claude_session_id = 'cs0'")
+        self.db.conn.commit()
+        self.assertIsNone(self.db._project_stats_ready())
+        self.assert_stats_match()
+
+        self.db.refresh_project_stats()
+        self.assertIsNotNone(self.db._project_stats_ready())
+        self.db.conn.execute("UPDATE ai_responses SET project = 'beta' WHERE id = 5")
+        self.db.conn.commit()
+        self.assertIsNone(self.db._project_stats_ready())
+        self.assert_stats_match()
+
+        self.db.refresh_project_stats()
+        self.db.conn.execute("UPDATE ai_responses SET response_text = 'edited' WHERE id = 6")
+        self.db.conn.commit()
+        self.assertIsNotNone(self.db._project_stats_ready())
+        self.assert_stats_match()
+
+
+class ChangeFeedTest(DatabaseTestCase):
+    def test_checkpoint_resumes_after_last_row(self):
+        checkpoint = {}
+        first = [(table, row['id']) for table, row in self.db.changes_since(checkpoint, tables=['ai_responses'])]
+        self.assertEqual(len(first), self.ROWS)
+        self.assertEqual(checkpoint, {'ai_responses': self.ROWS})
+
+        path = os.path.join(self.tmpdir, 'checkpoint.json')
+        save_checkpoint(path, checkpoint)
+        row_id = self.insert_response('cs0', 'alpha', '2024-01-01T00:00:00Z')
+        resumed = load_checkpoint(path)
+        rows = [(table, row['id']) for table, row in self.db.changes_since(resumed, tables=['ai_responses'])]
+        self.assertEqual(rows, [('ai_responses', row_id)])
+        self.assertEqual(resumed, {'ai_responses': row_id})
+
+    def test_partial_consumption_advances_checkpoint(self):
+        checkpoint = {}
+        for count, (table, row) in enumerate(self.db.changes_since(checkpoint, tables=['user_prompts'], batch_size=16)):
+            if count == 9:
+                break
+        self.assertEqual(checkpoint, {'user_prompts': row['id']})
+        rest = [row['id'] for _, row in self.db.changes_since(checkpoint, tables=['user_prompts'])]
+        self.assertEqual(rest, list(range(row['id'] + 1, self.ROWS + 1)))
+
+    def test_missing_checkpoint_file_starts_from_scratch(self):
+        self.assertEqual(load_checkpoint(os.path.join(self.tmpdir, 'missing.json')), {})
+
+    def test_change_checkpoint_starts_from_now(self):
+        checkpoint = self.db.change_checkpoint(['ai_responses'])
+        self.assertEqual(list(self.db.changes_since(checkpoint, tables=['ai_responses'])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+scripts/extraction/transcript_ingest 的增量续写与重建测试
+
+运行: python3 -m unittest discover -s tests/python
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import xml.dom.minidom
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'scripts', 'extraction'))
+
+import transcript_ingest  # noqa: E402
+
+
+def process_lines(filepath, start_offset, end_offset):
+    """每行一个块，供 run_extraction 在工作进程里调用"""
+    with open(filepath, 'rb') as f:
+        f.seek(start_offset)
+        data = f.read() if end_offset is None else f.read(end_offset - start_offset)
+    results = [
+        {'timestamp': '2026-01-01T00:00:00Z', 'xml': f"<b>{line.decode()}</b>"}
+        for line in data.split(b'\n') if line
+    ]
+    return results, start_offset + len(data)
+
+
+class TranscriptIngestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.transcripts = os.path.join(self.tmpdir, 'transcripts')
+        os.makedirs(self.transcripts)
+        self.transcript = os.path.join(self.transcripts, 'session.jsonl')
+        self.output = os.path.join(self.tmpdir, 'out.xml')
+        self.append_lines('old', 200)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def append_lines(self, prefix: str, count: int):
+        with open(self.transcript, 'a') as f:
+            f.writelines(f"{prefix}{i}\n" for i in range(count))
+
+    def run_extraction(self, *extra):
+        argv = ['transcript_ingest', '-d', self.transcripts, '-o', self.output, '-j', '1', *extra]
+        with mock.patch.object(sys, 'argv', argv), redirect_stdout(StringIO()):
+            return transcript_ingest.run_extraction(process_lines, 'test', self.output)
+
+    def blocks(self) -> list:
+        document = xml.dom.minidom.parse(self.output)
+        return [node.firstChild.data for node in document.getElementsByTagName('b')]
+
+    def test_resume_appends_only_new_lines(self):
+        self.assertEqual(self.run_extraction()[:2], (200, 200))
+        self.append_lines('new', 50)
+        self.assertEqual(self.run_extraction()[:2], (50, 250))
+        self.assertEqual(self.run_extraction()[:2], (0, 250))
+        expected = [f"old{i}" for i in range(200)] + [f"new{i}" for i in range(50)]
+        self.assertEqual(self.blocks(), expected)
+
+    def test_interrupted_rebuild_is_not_resumed(self):
+        self.run_extraction()
+        # 模拟重建写到一半进程被杀：没有 close()，也没有最后的 manifest.save()
+        manifest = transcript_ingest.Manifest(
+            self.output + '.manifest.json', output=self.output, compression='none'
+        )
+        writer = transcript_ingest.XmlFragmentWriter(manifest, 'none')
+        for i in range(300):
+            writer.write_block({'timestamp': '2026-01-01T00:00:00Z', 'xml': f"<b>partial{i}</b>"})
+        writer._raw.flush()
+
+        self.assertEqual(self.run_extraction()[:2], (200, 200))
+        self.assertEqual(self.blocks(), [f"old{i}" for i in range(200)])
+
+    def test_full_rebuilds_from_scratch(self):
+        self.run_extraction()
+        self.assertEqual(self.run_extraction('--full')[:2], (200, 200))
+        self.assertEqual(len(self.blocks()), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()